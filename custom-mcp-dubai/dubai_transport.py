@@ -2,17 +2,46 @@ from typing import Any, Optional
 import httpx
 from datetime import datetime, time
 from mcp.server.fastmcp import FastMCP
+import asyncio
+import bisect
+import concurrent.futures
 import io
+import json
+import mmap
+import itertools
 import re
 import os
+import ssl
+import tempfile
 import hashlib
+from contextlib import asynccontextmanager
 from pathlib import Path
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
 try:
     import pdfplumber
 except ImportError:
     pdfplumber = None
 
-mcp = FastMCP("dubai-transport", host="0.0.0.0")
+@asynccontextmanager
+async def _lifespan(_server):
+    """Warm the PDF cache in the background and close the HTTP client on shutdown."""
+    warm_task = asyncio.create_task(_warm_cache())
+    try:
+        yield
+    finally:
+        warm_task.cancel()
+        if _HTTP_CLIENT is not None:
+            await _HTTP_CLIENT.aclose()
+
+
+mcp = FastMCP("dubai-transport", host="0.0.0.0", lifespan=_lifespan)
 
 RTA_API_BASE = "https://www.rta.ae/wps/PA_JourneyPlanner/DownloadTimetableServlet"
 USER_AGENT = "dubai-transport-mcp/1.0"
@@ -21,6 +50,32 @@ USER_AGENT = "dubai-transport-mcp/1.0"
 CACHE_DIR = Path.home() / ".cache" / "dubai-transport-mcp"
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
+# TLS context built once and shared by the HTTP client. Certificate checks
+# stay off to match the previous verify=False behaviour, but keeping one
+# context alive lets warm reconnects resume TLS sessions instead of paying
+# a full handshake.
+_SSL_CONTEXT = ssl.create_default_context()
+_SSL_CONTEXT.check_hostname = False
+_SSL_CONTEXT.verify_mode = ssl.CERT_NONE
+
+# Shared HTTP client so repeated downloads reuse one TCP/TLS connection.
+# Created lazily because the event loop does not exist at import time.
+_HTTP_CLIENT: httpx.AsyncClient | None = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Get the shared httpx client, creating it on first use."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None:
+        _HTTP_CLIENT = httpx.AsyncClient(
+            follow_redirects=True,
+            verify=_SSL_CONTEXT,
+            timeout=90.0,
+            limits=httpx.Limits(max_keepalive_connections=8),
+        )
+    return _HTTP_CLIENT
+
+
 # Common bus routes in Dubai with their line IDs
 KNOWN_ROUTES = {
     "SH1": {"lineId": "dub:01SH1:%20:H:y08", "lineName": "bus%20SH1"},
@@ -33,6 +88,20 @@ KNOWN_ROUTES = {
     "C10": {"lineId": "dub:01C10:%20:H:y08", "lineName": "bus%20C10"},
 }
 
+# Sorted route listing reused by every tool message; rebuilt only when a
+# route is added at runtime instead of on each call.
+_ROUTES_SORTED: tuple[str, ...] = tuple(sorted(KNOWN_ROUTES))
+
+
+# Parsed schedules keyed by the SHA-256 of the PDF bytes, so repeat tool
+# calls on an unchanged PDF skip the extraction entirely.
+_SCHEDULE_CACHE: dict[str, dict[str, Any]] = {}
+
+
+def _pdf_sha256(pdf_content: bytes | mmap.mmap) -> str:
+    """Hash PDF content without copying large buffers."""
+    return hashlib.sha256(memoryview(pdf_content)).hexdigest()
+
 
 def get_cache_path(route_code: str) -> Path:
     """Get the cache file path for a route."""
@@ -41,30 +110,82 @@ def get_cache_path(route_code: str) -> Path:
     return CACHE_DIR / cache_filename
 
 
-def get_cached_pdf(route_code: str) -> bytes | None:
-    """Get cached PDF if it exists."""
+def get_schedule_cache_path(route_code: str) -> Path:
+    """Get the path of the parsed-schedule JSON sidecar for a route."""
+    return CACHE_DIR / f"{route_code.upper()}.schedule.json"
+
+
+def _load_persisted_schedule(route_code: str, pdf_sha: str) -> dict[str, Any] | None:
+    """Load a parsed schedule persisted alongside the PDF, if it matches the hash."""
+    sidecar = get_schedule_cache_path(route_code)
+    if not sidecar.exists():
+        return None
+    try:
+        with open(sidecar) as f:
+            persisted = json.load(f)
+        if persisted.get("sha256") == pdf_sha:
+            return persisted.get("schedule")
+    except Exception as e:
+        print(f"Error reading persisted schedule for route {route_code}: {e}")
+    return None
+
+
+def _persist_schedule(route_code: str, pdf_sha: str, schedule: dict[str, Any]) -> None:
+    """Persist a parsed schedule next to the cached PDF so warm starts skip parsing."""
+    try:
+        with open(get_schedule_cache_path(route_code), 'w') as f:
+            json.dump({"sha256": pdf_sha, "schedule": schedule}, f)
+    except Exception as e:
+        print(f"Error persisting schedule for route {route_code}: {e}")
+
+
+def get_cached_pdf(route_code: str) -> mmap.mmap | None:
+    """Get cached PDF if it exists.
+
+    Returns a read-only memory map rather than copying the file into a fresh
+    bytes object; repeat reads are served from the OS page cache.
+    """
     cache_path = get_cache_path(route_code)
     if cache_path.exists():
         try:
             with open(cache_path, 'rb') as f:
-                return f.read()
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
         except Exception as e:
             print(f"Error reading cached PDF: {e}")
     return None
 
 
 def save_pdf_to_cache(route_code: str, pdf_content: bytes) -> None:
-    """Save PDF to cache."""
+    """Save PDF to cache atomically.
+
+    Writes to a temp file and renames it into place, so a crash mid-write
+    can never leave a truncated PDF for get_cached_pdf to return. The temp
+    name is unique per call, so two concurrent writers for the same route
+    cannot interleave into one file.
+    """
     cache_path = get_cache_path(route_code)
+    tmp_path: Path | None = None
     try:
-        with open(cache_path, 'wb') as f:
+        if not pdf_content.startswith(b'%PDF'):
+            print(f"Refusing to cache non-PDF content for route {route_code}")
+            return
+
+        with tempfile.NamedTemporaryFile(dir=CACHE_DIR, suffix='.pdf.tmp', delete=False) as f:
+            tmp_path = Path(f.name)
             f.write(pdf_content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, cache_path)
         print(f"Cached PDF for route {route_code} at {cache_path}")
     except Exception as e:
         print(f"Error caching PDF: {e}")
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
 
 
-async def download_route_pdf(route_code: str, use_cache: bool = True) -> bytes | None:
+async def download_route_pdf(route_code: str, use_cache: bool = True) -> bytes | mmap.mmap | None:
     """Download the PDF timetable for a specific bus route.
 
     Args:
@@ -91,42 +212,81 @@ async def download_route_pdf(route_code: str, use_cache: bool = True) -> bytes |
         "Accept": "application/pdf"
     }
 
-    async with httpx.AsyncClient(follow_redirects=True, verify=False) as client:
-        try:
-            print(f"Downloading PDF for route {route_code} from RTA API...")
-            response = await client.get(url, headers=headers, timeout=90.0)
+    client = _get_http_client()
+    cache_path = get_cache_path(route_code)
+    tmp_path: Path | None = None
+    try:
+        print(f"Downloading PDF for route {route_code} from RTA API...")
+
+        # Stream chunks straight into a temp file next to the cache path
+        # instead of buffering the whole response, then writing a second
+        # copy. Each download gets its own temp name: cache warm-up and an
+        # early user request can fetch the same route simultaneously, and
+        # a shared tmp path would let their writes interleave.
+        buffer = bytearray()
+        async with client.stream("GET", url, headers=headers) as response:
             response.raise_for_status()
-
-            # Check if response is actually a PDF
             content_type = response.headers.get('content-type', '')
 
-            # Save response for debugging
-            pdf_content = response.content
+            with tempfile.NamedTemporaryFile(dir=CACHE_DIR, suffix='.pdf.tmp', delete=False) as f:
+                tmp_path = Path(f.name)
+                async for chunk in response.aiter_bytes(chunk_size=65536):
+                    f.write(chunk)
+                    buffer += chunk
+                f.flush()
+                os.fsync(f.fileno())
+
+        pdf_content = bytes(buffer)
+
+        if len(pdf_content) < 100:
+            print(f"Warning: Response too small ({len(pdf_content)} bytes). Might not be a valid PDF.")
+            print(f"Content preview: {pdf_content[:100]}")
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+            return None
 
-            if len(pdf_content) < 100:
-                print(f"Warning: Response too small ({len(pdf_content)} bytes). Might not be a valid PDF.")
-                print(f"Content preview: {pdf_content[:100]}")
-                return None
+        if 'pdf' not in content_type.lower() and not pdf_content.startswith(b'%PDF'):
+            print(f"Warning: Response might not be a PDF. Content-Type: {content_type}")
+            print(f"First bytes: {pdf_content[:50]}")
 
-            if 'pdf' not in content_type.lower() and not pdf_content.startswith(b'%PDF'):
-                print(f"Warning: Response might not be a PDF. Content-Type: {content_type}")
-                print(f"First bytes: {pdf_content[:50]}")
+        if pdf_content.startswith(b'%PDF'):
+            # Publish the fully written file with an atomic rename
+            os.replace(tmp_path, cache_path)
+            print(f"Cached PDF for route {route_code} at {cache_path}")
+        else:
+            tmp_path.unlink(missing_ok=True)
 
-            # Cache the PDF
-            save_pdf_to_cache(route_code, pdf_content)
+        return pdf_content
+    except httpx.TimeoutException as e:
+        print(f"Timeout downloading PDF for route {route_code}: {e}")
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+        return None
+    except httpx.HTTPStatusError as e:
+        print(f"HTTP error downloading PDF for route {route_code}: {e.response.status_code}")
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+        return None
+    except Exception as e:
+        print(f"Error downloading PDF for route {route_code}: {type(e).__name__}: {e}")
+        import traceback
+        traceback.print_exc()
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+        return None
+
+
+# Common time formats, compiled once (parse_time runs for every table cell)
+_TIME_PATTERNS = [
+    re.compile(r'^(\d{1,2}):(\d{2})$'),  # HH:MM or H:MM
+    re.compile(r'^(\d{1,2})\.(\d{2})$'),  # HH.MM or H.MM
+    re.compile(r'^(\d{1,2})(\d{2})$'),    # HHMM or HMM
+]
 
-            return pdf_content
-        except httpx.TimeoutException as e:
-            print(f"Timeout downloading PDF for route {route_code}: {e}")
-            return None
-        except httpx.HTTPStatusError as e:
-            print(f"HTTP error downloading PDF for route {route_code}: {e.response.status_code} - {e.response.text[:200]}")
-            return None
-        except Exception as e:
-            print(f"Error downloading PDF for route {route_code}: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+
+def _is_candidate_time(time_str: str) -> bool:
+    """Cheap pre-check so obvious non-time cells never reach the regex engine."""
+    return len(time_str) in (3, 4, 5) and time_str[0].isdigit()
 
 
 def parse_time(time_str: str) -> time | None:
@@ -136,15 +296,22 @@ def parse_time(time_str: str) -> time | None:
 
     time_str = time_str.strip()
 
-    # Common time formats
-    patterns = [
-        r'^(\d{1,2}):(\d{2})$',  # HH:MM or H:MM
-        r'^(\d{1,2})\.(\d{2})$',  # HH.MM or H.MM
-        r'^(\d{1,2})(\d{2})$',    # HHMM or HMM
-    ]
+    if not _is_candidate_time(time_str):
+        return None
 
-    for pattern in patterns:
-        match = re.match(pattern, time_str)
+    # Fast path for the dominant HH:MM format - no regex needed
+    if len(time_str) == 5 and time_str[2] == ':':
+        try:
+            hour = int(time_str[:2]) % 24
+            minute = int(time_str[3:])
+            if 0 <= minute < 60:
+                return time(hour, minute)
+        except ValueError:
+            pass
+        return None
+
+    for pattern in _TIME_PATTERNS:
+        match = pattern.match(time_str)
         if match:
             try:
                 hour = int(match.group(1))
@@ -162,59 +329,183 @@ def parse_time(time_str: str) -> time | None:
     return None
 
 
-def extract_schedule_from_pdf(pdf_content: bytes, route_code: str) -> dict[str, Any]:
-    """Extract schedule information from PDF timetable."""
-    if not pdfplumber:
+def process_schedule_table(table: list, schedule_data: dict[str, Any]) -> None:
+    """Process one extracted table's rows into schedule times and stop names."""
+    if not table or len(table) == 0:
+        return
+
+    # First row might be headers (stop names)
+    headers = table[0] if table else []
+
+    # Process time rows in a single pass: skip empty cells inline, stringify
+    # only non-str cells, and format without going through strftime
+    time_rows = schedule_data["times"]
+    for row in table[1:]:
+        if not row:
+            continue
+        times = []
+        for cell in row:
+            if not cell:
+                continue
+            parsed_time = parse_time(cell if isinstance(cell, str) else str(cell))
+            if parsed_time:
+                times.append(f"{parsed_time.hour:02d}:{parsed_time.minute:02d}")
+
+        if times:
+            time_rows.append(times)
+
+    # Store stop names from headers
+    if headers and not schedule_data["stops"]:
+        schedule_data["stops"] = [str(h).strip() for h in headers if h and str(h).strip()]
+
+
+# Multi-page PDFs are split across a process pool; below this page count the
+# pool startup overhead outweighs the parallel speedup, so stay serial.
+_PARALLEL_PAGE_THRESHOLD = 3
+
+# Table detection is by far the most expensive extraction step. When a page's
+# plain text already yields at least this many time tokens, skip it entirely.
+_TEXT_TIMES_THRESHOLD = 4
+_TEXT_TIME_RE = re.compile(r'\b((?:[01]?\d|2[0-3])[:.][0-5]\d)\b')
+
+
+def _page_payload(text: str | None, find_tables) -> tuple[str | None, list, list[str]]:
+    """Build one page's (text, tables, text_times) tuple.
+
+    Runs the expensive table-detection pass only when the page text does not
+    already contain enough time tokens on its own.
+    """
+    text_times = _TEXT_TIME_RE.findall(text) if text else []
+    if len(text_times) >= _TEXT_TIMES_THRESHOLD:
+        return text, [], text_times
+    return text, find_tables(), text_times
+
+
+def _extract_one_page(pdf_content: bytes, page_num: int) -> tuple[str | None, list, list[str]]:
+    """Extract text, table rows, and text times from a single page (process-pool worker)."""
+    if fitz:
+        with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+            page = doc[page_num]
+            return _page_payload(
+                page.get_text("text"),
+                lambda: [table.extract() for table in page.find_tables()],
+            )
+    with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+        page = pdf.pages[page_num]
+        return _page_payload(
+            page.extract_text(),
+            lambda: page.extract_tables() or [],
+        )
+
+
+def _extract_pages(pdf_content: bytes | mmap.mmap) -> list[tuple[str | None, list, list[str]]]:
+    """Extract (text, tables, text_times) per page, fanning out to a process pool for large PDFs."""
+    # fitz rejects mmap streams ("bad stream: type(stream)=<class 'mmap.mmap'>"),
+    # so cached maps are copied out here; hashing upstream stays zero-copy
+    if not isinstance(pdf_content, bytes):
+        pdf_content = bytes(pdf_content)
+
+    if fitz:
+        with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+            num_pages = doc.page_count
+            if num_pages <= _PARALLEL_PAGE_THRESHOLD:
+                return [
+                    _page_payload(
+                        page.get_text("text"),
+                        lambda page=page: [table.extract() for table in page.find_tables()],
+                    )
+                    for page in doc
+                ]
+    else:
+        with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+            num_pages = len(pdf.pages)
+            if num_pages <= _PARALLEL_PAGE_THRESHOLD:
+                return [
+                    _page_payload(
+                        page.extract_text(),
+                        lambda page=page: page.extract_tables() or [],
+                    )
+                    for page in pdf.pages
+                ]
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(num_pages, os.cpu_count() or 1)
+    ) as executor:
+        return list(executor.map(
+            _extract_one_page,
+            itertools.repeat(pdf_content),
+            range(num_pages),
+        ))
+
+
+def extract_schedule_from_pdf(
+    pdf_content: bytes | mmap.mmap,
+    route_code: str,
+    want_raw_text: bool = True
+) -> dict[str, Any]:
+    """Extract schedule information from PDF timetable.
+
+    Uses PyMuPDF when available (roughly an order of magnitude faster than
+    pdfplumber for text extraction), falling back to pdfplumber otherwise.
+    Page texts are kept as a list so callers that cap or skip the raw text
+    never pay for a full multi-page join; pass want_raw_text=False to not
+    retain them at all.
+    """
+    if not fitz and not pdfplumber:
         return {
-            "error": "PDF parsing library not available. Install pdfplumber: pip install pdfplumber",
+            "error": "PDF parsing library not available. Install PyMuPDF: pip install pymupdf",
             "route": route_code
         }
 
+    # Skip parsing entirely when this exact PDF has been parsed before
+    pdf_sha = _pdf_sha256(pdf_content)
+    cached_schedule = _SCHEDULE_CACHE.get(pdf_sha)
+    if cached_schedule is not None:
+        return cached_schedule
+
+    cached_schedule = _load_persisted_schedule(route_code, pdf_sha)
+    if cached_schedule is not None:
+        _SCHEDULE_CACHE[pdf_sha] = cached_schedule
+        return cached_schedule
+
     try:
         schedule_data = {
             "route": route_code,
             "stops": [],
             "times": [],
-            "raw_text": "",
+            "page_texts": [],
             "parsed": False
         }
 
-        with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-            all_text = []
-
-            for page_num, page in enumerate(pdf.pages):
-                # Extract text
-                text = page.extract_text()
-                if text:
-                    all_text.append(f"--- Page {page_num + 1} ---\n{text}")
-
-                # Try to extract tables
-                tables = page.extract_tables()
-                if tables:
-                    for table_idx, table in enumerate(tables):
-                        if table and len(table) > 0:
-                            # First row might be headers (stop names)
-                            headers = table[0] if table else []
-
-                            # Process time rows
-                            for row in table[1:]:
-                                if row and any(cell for cell in row if cell):
-                                    # Filter out empty cells and try to parse times
-                                    times = []
-                                    for cell in row:
-                                        parsed_time = parse_time(str(cell)) if cell else None
-                                        if parsed_time:
-                                            times.append(parsed_time.strftime("%H:%M"))
-
-                                    if times:
-                                        schedule_data["times"].append(times)
-
-                            # Store stop names from headers
-                            if headers and not schedule_data["stops"]:
-                                schedule_data["stops"] = [str(h).strip() for h in headers if h and str(h).strip()]
-
-            schedule_data["raw_text"] = "\n\n".join(all_text)
-            schedule_data["parsed"] = bool(schedule_data["times"] or schedule_data["raw_text"])
+        all_text = schedule_data["page_texts"]
+
+        for page_num, (text, tables, text_times) in enumerate(_extract_pages(pdf_content)):
+            # Extract text
+            if want_raw_text and text:
+                all_text.append(f"--- Page {page_num + 1} ---\n{text}")
+
+            # Prefer extracted tables; pages whose text parsed cleanly skip
+            # table detection and contribute their text times directly
+            if tables:
+                for table in tables:
+                    process_schedule_table(table, schedule_data)
+            elif text_times:
+                times = []
+                for time_str in text_times:
+                    parsed_time = parse_time(time_str)
+                    if parsed_time:
+                        times.append(f"{parsed_time.hour:02d}:{parsed_time.minute:02d}")
+                if times:
+                    schedule_data["times"].append(times)
+
+        schedule_data["parsed"] = bool(schedule_data["times"] or all_text)
+        schedule_data["sorted_minutes"] = _build_sorted_minutes(schedule_data["times"])
+
+        # Reduced parses would poison the cache for callers that need the
+        # raw text, so only full parses are cached
+        if want_raw_text:
+            _SCHEDULE_CACHE[pdf_sha] = schedule_data
+            _persist_schedule(route_code, pdf_sha, schedule_data)
 
         return schedule_data
 
@@ -225,41 +516,98 @@ def extract_schedule_from_pdf(pdf_content: bytes, route_code: str) -> dict[str,
         }
 
 
+def extract_times_only(pdf_content: bytes | mmap.mmap) -> list[int] | None:
+    """Extract just the departure times as sorted minutes since midnight.
+
+    Far cheaper than extract_schedule_from_pdf for callers that need no
+    stops or raw text: one text pass and a single compiled regex per page,
+    with no table detection at all.
+    """
+    if not fitz and not pdfium and not pdfplumber:
+        return None
+
+    # Neither PyMuPDF nor pdfium accepts an mmap as its stream argument;
+    # materialize bytes once before opening
+    if not isinstance(pdf_content, bytes):
+        pdf_content = bytes(pdf_content)
+
+    try:
+        minutes = set()
+
+        if fitz:
+            with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+                page_texts = [page.get_text("text") for page in doc]
+        elif pdfium:
+            # PDFium is one of the fastest rule-based text extractors and a
+            # good middle ground when PyMuPDF is not installed
+            pdf = pdfium.PdfDocument(pdf_content)
+            try:
+                page_texts = [page.get_textpage().get_text_range() for page in pdf]
+            finally:
+                pdf.close()
+        else:
+            with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+                page_texts = [page.extract_text() for page in pdf.pages]
+
+        for text in page_texts:
+            if not text:
+                continue
+            for time_str in _TEXT_TIME_RE.findall(text):
+                parsed_time = parse_time(time_str)
+                if parsed_time:
+                    minutes.add(parsed_time.hour * 60 + parsed_time.minute)
+
+        return sorted(minutes)
+    except Exception as e:
+        print(f"Error extracting times from PDF: {e}")
+        return None
+
+
+def _build_sorted_minutes(times: list[list[str]]) -> list[int]:
+    """Build a sorted, deduplicated list of departures as minutes since midnight."""
+    minutes = set()
+    for time_row in times:
+        for time_str in time_row:
+            dep_time = parse_time(time_str)
+            if dep_time:
+                minutes.add(dep_time.hour * 60 + dep_time.minute)
+    return sorted(minutes)
+
+
 def find_next_departure(schedule_data: dict, requested_time: str) -> str:
     """Find the next bus departure after the requested time."""
     if "error" in schedule_data:
         return f"Error: {schedule_data['error']}"
 
-    if not schedule_data.get("times"):
+    if not schedule_data.get("times") and not schedule_data.get("sorted_minutes"):
         return "No schedule times found in the timetable. Raw content available in full schedule."
 
     req_time = parse_time(requested_time)
     if not req_time:
         return f"Invalid time format: {requested_time}. Please use HH:MM format."
 
-    # Convert all departure times and find the next one
-    next_departures = []
+    # The schedule is immutable per PDF, so departures are pre-sorted once at
+    # extraction time and each query is a single bisect
+    sorted_minutes = schedule_data.get("sorted_minutes")
+    if sorted_minutes is None:
+        sorted_minutes = _build_sorted_minutes(schedule_data["times"])
 
-    for time_row in schedule_data["times"]:
-        for time_str in time_row:
-            dep_time = parse_time(time_str)
-            if dep_time and dep_time >= req_time:
-                next_departures.append((dep_time, time_str))
+    req_minutes = req_time.hour * 60 + req_time.minute
+    idx = bisect.bisect_left(sorted_minutes, req_minutes)
 
-    if not next_departures:
-        return f"No departures found after {requested_time} for route {schedule_data['route']}"
+    # Show up to 5 next departures
+    upcoming = sorted_minutes[idx:idx + 5]
 
-    # Sort and get the earliest
-    next_departures.sort(key=lambda x: x[0])
+    if not upcoming:
+        return f"No departures found after {requested_time} for route {schedule_data['route']}"
 
     result = [f"Next departures for Route {schedule_data['route']} after {requested_time}:\n"]
 
-    # Show up to 5 next departures
-    for dep_time, time_str in next_departures[:5]:
-        time_diff = (datetime.combine(datetime.today(), dep_time) -
-                    datetime.combine(datetime.today(), req_time))
-        minutes = int(time_diff.total_seconds() / 60)
-        result.append(f"  {time_str} (in {minutes} minutes)")
+    # Stay in integer minutes end-to-end; no datetime objects are needed
+    # just to render a difference
+    for dep_minutes in upcoming:
+        minutes = dep_minutes - req_minutes
+        result.append(f"  {dep_minutes // 60:02d}:{dep_minutes % 60:02d} (in {minutes} minutes)")
 
     if schedule_data.get("stops"):
         result.append(f"\nStops: {', '.join(schedule_data['stops'][:5])}")
@@ -269,6 +617,51 @@ def find_next_departure(schedule_data: dict, requested_time: str) -> str:
     return "\n".join(result)
 
 
+async def get_parsed_schedule(route_code: str, times_only: bool = False) -> dict[str, Any] | None:
+    """Download (or read from cache) and parse the timetable for a route.
+
+    Single entry point for the tool handlers, so consecutive calls parse at
+    most once per (route, PDF-bytes): the SHA-keyed schedule cache serves
+    repeats, and times_only callers get the cheap text-only pass on a miss.
+    """
+    pdf_content = await download_route_pdf(route_code)
+    if not pdf_content:
+        return None
+
+    if times_only:
+        # Reuse a full parse when one is already cached for these bytes
+        cached_schedule = _SCHEDULE_CACHE.get(_pdf_sha256(pdf_content))
+        if cached_schedule is not None:
+            return cached_schedule
+
+        sorted_minutes = await asyncio.to_thread(extract_times_only, pdf_content)
+        if sorted_minutes:
+            return {"route": route_code, "sorted_minutes": sorted_minutes}
+
+    schedule = await asyncio.to_thread(extract_schedule_from_pdf, pdf_content, route_code)
+    if "error" not in schedule:
+        schedule["pdf_size"] = len(pdf_content)
+    return schedule
+
+
+async def _warm_cache() -> None:
+    """Prefetch and pre-parse every known route timetable in the background.
+
+    Turns the first user query per route from download+parse into a cache
+    lookup. Bounded by a small semaphore so startup does not hammer the
+    RTA API.
+    """
+    semaphore = asyncio.Semaphore(4)
+
+    async def warm_route(route_code: str) -> None:
+        async with semaphore:
+            pdf_content = await download_route_pdf(route_code)
+            if pdf_content:
+                await asyncio.to_thread(extract_schedule_from_pdf, pdf_content, route_code)
+
+    await asyncio.gather(*(warm_route(route_code) for route_code in KNOWN_ROUTES))
+
+
 @mcp.tool()
 async def get_available_routes() -> str:
     """Get a list of available Dubai bus routes that can be queried.
@@ -278,7 +671,7 @@ async def get_available_routes() -> str:
     result = ["Available RTA Dubai Bus Routes:\n"]
     result.append("=" * 50)
 
-    for route_code in sorted(KNOWN_ROUTES.keys()):
+    for route_code in _ROUTES_SORTED:
         result.append(f"  Route {route_code}")
 
     result.append("\n" + "=" * 50)
@@ -298,16 +691,13 @@ async def get_route_schedule(route_code: str) -> str:
     route_code = route_code.upper().strip()
 
     if route_code not in KNOWN_ROUTES:
-        available = ", ".join(sorted(KNOWN_ROUTES.keys()))
-        return f"Route {route_code} not found. Available routes: {available}"
+        return f"Route {route_code} not found. Available routes: {', '.join(_ROUTES_SORTED)}"
 
-    pdf_content = await download_route_pdf(route_code)
+    schedule = await get_parsed_schedule(route_code)
 
-    if not pdf_content:
+    if not schedule:
         return f"Failed to download timetable for route {route_code}"
 
-    schedule = extract_schedule_from_pdf(pdf_content, route_code)
-
     if "error" in schedule:
         return f"Error processing timetable: {schedule['error']}"
 
@@ -329,15 +719,31 @@ async def get_route_schedule(route_code: str) -> str:
                 times_str += f" ... (+{len(time_row) - 5} more)"
             result.append(f"  {i}. {times_str}")
 
-    if schedule.get("raw_text") and not schedule.get("times"):
-        result.append("\n\nRaw Timetable Content (first 1500 characters):")
-        result.append("-" * 60)
-        result.append(schedule['raw_text'][:1500])
-        if len(schedule['raw_text']) > 1500:
-            result.append("\n... (content truncated)")
+    if not schedule.get("times"):
+        # Join lazily and stop once the display cap is covered; older
+        # persisted sidecars may still carry a pre-joined raw_text
+        page_texts = schedule.get("page_texts")
+        if page_texts is None and schedule.get("raw_text"):
+            page_texts = [schedule["raw_text"]]
+
+        if page_texts:
+            raw_parts = []
+            total_len = 0
+            for page_text in page_texts:
+                raw_parts.append(page_text)
+                total_len += len(page_text) + 2
+                if total_len > 1500:
+                    break
+
+            raw_text = "\n\n".join(raw_parts)
+            result.append("\n\nRaw Timetable Content (first 1500 characters):")
+            result.append("-" * 60)
+            result.append(raw_text[:1500])
+            if len(raw_text) > 1500 or len(page_texts) > len(raw_parts):
+                result.append("\n... (content truncated)")
 
     result.append("\n" + "=" * 60)
-    result.append(f"\nPDF Size: {len(pdf_content)} bytes")
+    result.append(f"\nPDF Size: {schedule.get('pdf_size', 0)} bytes")
     result.append(f"Use find_next_bus('{route_code}', 'HH:MM') to find next departure")
 
     return "\n".join(result)
@@ -354,16 +760,14 @@ async def find_next_bus(route_code: str, departure_time: str) -> str:
     route_code = route_code.upper().strip()
 
     if route_code not in KNOWN_ROUTES:
-        available = ", ".join(sorted(KNOWN_ROUTES.keys()))
-        return f"Route {route_code} not found. Available routes: {available}"
+        return f"Route {route_code} not found. Available routes: {', '.join(_ROUTES_SORTED)}"
 
-    pdf_content = await download_route_pdf(route_code)
+    # find_next_bus only needs departure times, so ask for the reduced parse
+    schedule = await get_parsed_schedule(route_code, times_only=True)
 
-    if not pdf_content:
+    if not schedule:
         return f"Failed to download timetable for route {route_code}"
 
-    schedule = extract_schedule_from_pdf(pdf_content, route_code)
-
     return find_next_departure(schedule, departure_time)
 
 
@@ -376,12 +780,15 @@ async def add_custom_route(route_code: str, line_id: str, line_name: str) -> str
         line_id: Full RTA line ID (e.g., "dub:01X28:%20:H:y08")
         line_name: URL-encoded line name (e.g., "bus%20X28")
     """
+    global _ROUTES_SORTED
+
     route_code = route_code.upper().strip()
 
     KNOWN_ROUTES[route_code] = {
         "lineId": line_id,
         "lineName": line_name
     }
+    _ROUTES_SORTED = tuple(sorted(KNOWN_ROUTES))
 
     return f"Successfully added route {route_code}. You can now query it using get_route_schedule or find_next_bus."
 
@@ -400,7 +807,13 @@ async def get_cache_status() -> str:
         result.append("Cache directory does not exist.")
         return "\n".join(result)
 
-    cached_files = list(CACHE_DIR.glob("*.pdf"))
+    # One scandir pass instead of glob + a stat call per file; DirEntry
+    # caches the stat result from the directory scan
+    with os.scandir(CACHE_DIR) as it:
+        cached_files = sorted(
+            (entry for entry in it if entry.name.endswith(".pdf")),
+            key=lambda entry: entry.name
+        )
 
     if not cached_files:
         result.append("No cached PDFs found.")
@@ -408,10 +821,10 @@ async def get_cache_status() -> str:
         result.append(f"Cached Routes ({len(cached_files)}):\n")
 
         total_size = 0
-        for cache_file in sorted(cached_files):
-            size = cache_file.stat().st_size
+        for entry in cached_files:
+            size = entry.stat().st_size
             total_size += size
-            route_name = cache_file.stem
+            route_name = entry.name[:-4]
             result.append(f"  {route_name}: {size:,} bytes ({size / 1024:.1f} KB)")
 
         result.append(f"\nTotal Cache Size: {total_size:,} bytes ({total_size / 1024:.1f} KB)")
@@ -431,10 +844,19 @@ async def clear_cache(route_code: Optional[str] = None) -> str:
     if route_code:
         route_code = route_code.upper().strip()
         cache_path = get_cache_path(route_code)
+        sidecar = get_schedule_cache_path(route_code)
 
         if cache_path.exists():
             try:
+                # Evict the parsed schedule for this PDF from memory while
+                # the sidecar still records its hash
+                try:
+                    with open(sidecar) as f:
+                        _SCHEDULE_CACHE.pop(json.load(f).get("sha256"), None)
+                except Exception:
+                    pass
                 cache_path.unlink()
+                sidecar.unlink(missing_ok=True)
                 return f"Successfully cleared cache for route {route_code}"
             except Exception as e:
                 return f"Error clearing cache for route {route_code}: {e}"
@@ -449,6 +871,12 @@ async def clear_cache(route_code: Optional[str] = None) -> str:
             for cache_file in cached_files:
                 cache_file.unlink()
 
+            # Parsed schedules follow the PDFs out: the JSON sidecars on
+            # disk and the SHA-keyed entries held in memory
+            for sidecar in CACHE_DIR.glob("*.schedule.json"):
+                sidecar.unlink()
+            _SCHEDULE_CACHE.clear()
+
             return f"Successfully cleared cache for {count} route(s)"
         except Exception as e:
             return f"Error clearing cache: {e}"
@@ -485,10 +913,12 @@ async def import_pdf_timetable(route_code: str, pdf_path: str) -> str:
 
         # Add route to KNOWN_ROUTES if not already there
         if route_code not in KNOWN_ROUTES:
+            global _ROUTES_SORTED
             KNOWN_ROUTES[route_code] = {
                 "lineId": f"dub:01{route_code}:%20:H:y08",
                 "lineName": f"bus%20{route_code}"
             }
+            _ROUTES_SORTED = tuple(sorted(KNOWN_ROUTES))
 
         return f"Successfully imported PDF timetable for route {route_code} ({len(pdf_content)} bytes)\nYou can now use get_route_schedule('{route_code}') or find_next_bus('{route_code}', 'HH:MM')"
 
@@ -1,41 +1,225 @@
 from typing import Any, Optional
+import asyncio
+import functools
 import httpx
 import os
 import re
-from datetime import datetime, timedelta
+import time
+from contextlib import asynccontextmanager
 from mcp.server.fastmcp import FastMCP
 
-mcp = FastMCP("helsinki-transport", host="0.0.0.0")
+# orjson decodes large number-heavy payloads noticeably faster than the
+# stdlib parser; fall back to stdlib json when it is not installed.
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    import json
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+
+@asynccontextmanager
+async def _lifespan(_server):
+    """Close the shared HTTP client when the server shuts down."""
+    try:
+        yield
+    finally:
+        await _client.aclose()
+
+
+mcp = FastMCP("helsinki-transport", host="0.0.0.0", lifespan=_lifespan)
 
 DIGITRANSIT_API_URL = "https://api.digitransit.fi/routing/v2/hsl/gtfs/v1"
 DIGITRANSIT_API_KEY = os.getenv("DIGITRANSIT_API_KEY", "your_key")
 DEFAULT_STOP_ID = os.getenv("DEFAULT_STOP_ID", "HSL:1040129")  # Arkadian puisto
 USER_AGENT = "helsinki-transport-mcp/1.0"
 
+# One pre-compiled alternation for location-style queries instead of three
+# per-call re.search passes; exactly one named group matches.
+# Reject malformed stop IDs locally instead of burning a round trip on a
+# query Digitransit will refuse anyway.
+_STOP_ID_RE = re.compile(r"^HSL:\d+$")
+
+_LOC_RE = re.compile(
+    r"(?:(?:near|close to|around|by|at|in)\s+(?P<a>.+))"
+    r"|(?:(?P<b>.+?)\s+(?:area|vicinity|neighborhood))"
+    r"|(?:stops?\s+(?:near|around|at|in)\s+(?P<c>.+))",
+    re.IGNORECASE,
+)
+
+# Header and timeout singletons, built once instead of re-validated on
+# every request.
+_GQL_HEADERS = httpx.Headers({
+    "User-Agent": USER_AGENT,
+    "Content-Type": "application/json",
+    "digitransit-subscription-key": DIGITRANSIT_API_KEY,
+})
+_GEO_HEADERS = httpx.Headers({
+    "digitransit-subscription-key": DIGITRANSIT_API_KEY,
+})
+_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+# Shared HTTP client: one keep-alive connection pool for all Digitransit
+# calls instead of a fresh TCP+TLS handshake per tool invocation.
+_client = httpx.AsyncClient(
+    http2=True,
+    timeout=_TIMEOUT,
+    headers={"User-Agent": USER_AGENT},
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+)
+
+
+# GraphQL documents are module-level constants parameterized with
+# $variables, so every stop ID reuses the same query text and the server
+# can cache its parsed/validated query plan.
+_QUERY_DEPARTURES = """
+query Departures($id: String!, $n: Int!) {
+  stop(id: $id) {
+    name
+    gtfsId
+    stoptimesWithoutPatterns(numberOfDepartures: $n) {
+      scheduledDeparture
+      departureDelay
+      serviceDay
+      headsign
+      trip {
+        routeShortName
+      }
+    }
+  }
+}
+"""
 
-async def make_graphql_request(query: str) -> dict[str, Any] | None:
-    """Make a GraphQL request to the Helsinki Digitransit API with proper error handling."""
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Content-Type": "application/json",
-        "digitransit-subscription-key": DIGITRANSIT_API_KEY
+_QUERY_TIMETABLE = """
+query Timetable($id: String!, $start: Long!, $range: Int!) {
+  stop(id: $id) {
+    name
+    gtfsId
+    stoptimesWithoutPatterns(
+      startTime: $start
+      timeRange: $range
+      numberOfDepartures: 50
+    ) {
+      scheduledDeparture
+      departureDelay
+      serviceDay
+      headsign
+      trip {
+        routeShortName
+      }
+    }
+  }
+}
+"""
+
+_QUERY_STOP_INFO = """
+query StopInfo($id: String!) {
+  stop(id: $id) {
+    name
+    gtfsId
+    code
+    desc
+    lat
+    lon
+    zoneId
+    locationType
+    platformCode
+  }
+}
+"""
+
+_QUERY_STOPS_BY_NAME = """
+query StopsByName($name: String!) {
+  stops(name: $name) {
+    gtfsId
+    name
+    code
+    desc
+    lat
+    lon
+  }
+}
+"""
+
+_QUERY_NEAREST = """
+query Nearest($lat: Float!, $lon: Float!, $radius: Int!, $n: Int!) {
+  nearest(
+    lat: $lat
+    lon: $lon
+    maxDistance: $radius
+    first: $n
+    filterByPlaceTypes: STOP
+  ) {
+    edges {
+      node {
+        place {
+          ...on Stop {
+            gtfsId
+            name
+            code
+            desc
+            lat
+            lon
+          }
+        }
+        distance
+      }
     }
+  }
+}
+"""
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                DIGITRANSIT_API_URL,
-                headers=headers,
-                json={"query": query},
-                timeout=30.0
-            )
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"Error making GraphQL request: {e}")
-            return None
 
+def async_ttl_cache(maxsize: int = 512, ttl: float = 3600):
+    """Cache coroutine results in-process for `ttl` seconds.
 
+    Entries are keyed on the full argument tuple; None results are not
+    cached, and the oldest entry is evicted once `maxsize` is reached.
+    """
+    def decorator(func):
+        cache: dict[tuple, tuple[float, Any]] = {}
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            hit = cache.get(key)
+            if hit is not None and hit[0] > time.monotonic():
+                return hit[1]
+            value = await func(*args, **kwargs)
+            if value is not None:
+                if len(cache) >= maxsize:
+                    cache.pop(next(iter(cache)))
+                cache[key] = (time.monotonic() + ttl, value)
+            return value
+        return wrapper
+    return decorator
+
+
+async def make_graphql_request(query: str, variables: dict[str, Any] | None = None) -> dict[str, Any] | None:
+    """Make a GraphQL request to the Helsinki Digitransit API with proper error handling."""
+    payload: dict[str, Any] = {"query": query}
+    if variables:
+        payload["variables"] = variables
+
+    try:
+        # content= with pre-serialized bytes skips httpx's stdlib json path
+        response = await _client.post(
+            DIGITRANSIT_API_URL,
+            headers=_GQL_HEADERS,
+            content=_json_dumps(payload)
+        )
+        response.raise_for_status()
+        return _json_loads(response.content)
+    except Exception as e:
+        print(f"Error making GraphQL request: {e}")
+        return None
+
+
+@async_ttl_cache(maxsize=512, ttl=3600)
 async def geocode_location(location_name: str) -> tuple[float, float, str] | None:
     """Geocode a location name to coordinates using Digitransit Geocoding API.
 
@@ -50,77 +234,60 @@ async def geocode_location(location_name: str) -> tuple[float, float, str] | Non
         "text": location_name,
         "size": 1
     }
-    headers = {
-        "digitransit-subscription-key": DIGITRANSIT_API_KEY
-    }
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, params=params, headers=headers, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-
-            features = data.get("features", [])
-            if features and len(features) > 0:
-                coords = features[0]["geometry"]["coordinates"]
-                lon, lat = coords  # GeoJSON uses [lon, lat] order
-                label = features[0]["properties"].get("label", location_name)
-                return (lat, lon, label)
-            return None
-        except Exception as e:
-            print(f"Error geocoding location: {e}")
-            return None
-
-
-def format_time(service_day: int, seconds: int) -> str:
-    """Convert service day and seconds to readable time string."""
-    timestamp = service_day + seconds
-    dt = datetime.fromtimestamp(timestamp)
-    return dt.strftime("%H:%M:%S")
-
-
-def format_departure(stoptime: dict, service_day: int) -> str:
-    """Format a departure into a readable string."""
-    scheduled_dep = stoptime.get("scheduledDeparture", 0)
-    realtime_dep = stoptime.get("realtimeDeparture", scheduled_dep)
-    delay = stoptime.get("departureDelay", 0)
-    headsign = stoptime.get("headsign", "Unknown destination")
-
-    trip = stoptime.get("trip", {})
-    route_short_name = trip.get("routeShortName", "N/A")
-
-    scheduled_time = format_time(service_day, scheduled_dep)
-
-    # Format time with delay if applicable
-    time_info = scheduled_time
-    if delay > 0:
-        time_info = f"{scheduled_time} (Delayed by {delay}s)"
-    elif delay < 0:
-        time_info = f"{scheduled_time} (Early by {abs(delay)}s)"
-
-    return f"{time_info} - Route {route_short_name} to {headsign}"
-
-
-def format_arrival(stoptime: dict, service_day: int) -> str:
-    """Format an arrival into a readable string."""
-    scheduled_arr = stoptime.get("scheduledArrival", 0)
-    realtime_arr = stoptime.get("realtimeArrival", scheduled_arr)
-    delay = stoptime.get("arrivalDelay", 0)
-    headsign = stoptime.get("headsign", "Unknown origin")
-
-    trip = stoptime.get("trip", {})
-    route_short_name = trip.get("routeShortName", "N/A")
-
-    scheduled_time = format_time(service_day, scheduled_arr)
-
-    # Format time with delay if applicable
-    time_info = scheduled_time
-    if delay > 0:
-        time_info = f"{scheduled_time} (Delayed by {delay}s)"
-    elif delay < 0:
-        time_info = f"{scheduled_time} (Early by {abs(delay)}s)"
-
-    return f"{time_info} - Route {route_short_name} from {headsign}"
+    try:
+        response = await _client.get(url, params=params, headers=_GEO_HEADERS, timeout=10.0)
+        response.raise_for_status()
+        data = _json_loads(response.content)
+
+        features = data.get("features", [])
+        if features and len(features) > 0:
+            coords = features[0]["geometry"]["coordinates"]
+            lon, lat = coords  # GeoJSON uses [lon, lat] order
+            label = features[0]["properties"].get("label", location_name)
+            return (lat, lon, label)
+        return None
+    except Exception as e:
+        print(f"Error geocoding location: {e}")
+        return None
+
+
+def _fmt_stoptime(stoptime: dict, kind: str) -> str:
+    """Format one stoptime line; `kind` is "dep" for departures, "arr" for arrivals."""
+    sched_key, delay_key, prep, fallback = (
+        ("scheduledDeparture", "departureDelay", "to", "Unknown destination")
+        if kind == "dep"
+        else ("scheduledArrival", "arrivalDelay", "from", "Unknown origin")
+    )
+
+    scheduled = stoptime.get(sched_key, 0)
+    delay = stoptime.get(delay_key, 0)
+    headsign = stoptime.get("headsign", fallback)
+    route_short_name = stoptime.get("trip", {}).get("routeShortName", "N/A")
+
+    # Seconds-past-midnight to HH:MM:SS with pure integer arithmetic; no
+    # datetime allocation or strftime per stoptime.
+    hours, rem = divmod(scheduled, 3600)
+    minutes, seconds = divmod(rem, 60)
+    suffix = "" if delay == 0 else f" ({'Delayed' if delay > 0 else 'Early'} by {abs(delay)}s)"
+
+    return (
+        f"{hours % 24:02d}:{minutes:02d}:{seconds:02d}{suffix}"
+        f" - Route {route_short_name} {prep} {headsign}"
+    )
+
+
+@async_ttl_cache(maxsize=256, ttl=15)
+async def _fetch_stop_departures(stop_id: str, limit: int) -> dict[str, Any] | None:
+    """Fetch one stop's departures payload through the short TTL cache.
+
+    The cache wraps the fetch rather than the tool: a failed request
+    returns None, which is never cached, so transient upstream errors do
+    not pin an error string for the TTL.
+    """
+    data = await make_graphql_request(_QUERY_DEPARTURES, {"id": stop_id, "n": limit})
+    if not data or "data" not in data or not data["data"].get("stop"):
+        return None
+    return data["data"]["stop"]
 
 
 @mcp.tool()
@@ -143,50 +310,36 @@ async def get_departures(
         A formatted string showing departure times, routes, and destinations.
         Includes delay information if available.
     """
-    query = f"""
-    {{
-      stop(id: "{stop_id}") {{
-        name
-        gtfsId
-        stoptimesWithoutPatterns(numberOfDepartures: {limit}) {{
-          scheduledDeparture
-          realtimeDeparture
-          departureDelay
-          realtime
-          serviceDay
-          headsign
-          trip {{
-            routeShortName
-            route {{
-              shortName
-              longName
-            }}
-          }}
-        }}
-      }}
-    }}
-    """
+    if not _STOP_ID_RE.fullmatch(stop_id):
+        return f"Invalid stop_id format: {stop_id} (expected e.g. HSL:1040129)"
 
-    data = await make_graphql_request(query)
+    stop_data = await _fetch_stop_departures(stop_id, limit)
 
-    if not data or "data" not in data or not data["data"].get("stop"):
+    if not stop_data:
         return f"Unable to fetch departures for stop ID: {stop_id}"
 
-    stop_data = data["data"]["stop"]
     stop_name = stop_data.get("name", "Unknown stop")
     stoptimes = stop_data.get("stoptimesWithoutPatterns", [])
 
     if not stoptimes:
         return f"No departures found for stop: {stop_name} ({stop_id})"
 
-    # Get service day from first stoptime
-    service_day = stoptimes[0].get("serviceDay", 0)
-
-    departures = [format_departure(st, service_day) for st in stoptimes]
+    departures = [_fmt_stoptime(st, "dep") for st in stoptimes]
 
     return f"Departures from {stop_name} ({stop_id}):\n" + "\n".join(departures)
 
 
+@async_ttl_cache(maxsize=256, ttl=15)
+async def _fetch_stop_timetable(stop_id: str, start_time: int, time_range: int) -> dict[str, Any] | None:
+    """Fetch one stop's timetable window; None (uncached) on failure."""
+    data = await make_graphql_request(
+        _QUERY_TIMETABLE, {"id": stop_id, "start": start_time, "range": time_range}
+    )
+    if not data or "data" not in data or not data["data"].get("stop"):
+        return None
+    return data["data"]["stop"]
+
+
 @mcp.tool()
 async def get_timetable(
     stop_id: str = DEFAULT_STOP_ID,
@@ -208,53 +361,116 @@ async def get_timetable(
     Returns:
         A formatted string showing scheduled departures within the time range.
     """
-    query = f"""
-    {{
-      stop(id: "{stop_id}") {{
+    if not _STOP_ID_RE.fullmatch(stop_id):
+        return f"Invalid stop_id format: {stop_id} (expected e.g. HSL:1040129)"
+
+    stop_data = await _fetch_stop_timetable(stop_id, start_time, time_range)
+
+    if not stop_data:
+        return f"Unable to fetch timetable for stop ID: {stop_id}"
+
+    stop_name = stop_data.get("name", "Unknown stop")
+    stoptimes = stop_data.get("stoptimesWithoutPatterns", [])
+
+    if not stoptimes:
+        return f"No timetable entries found for stop: {stop_name} ({stop_id})"
+
+    departures = [_fmt_stoptime(st, "dep") for st in stoptimes]
+
+    time_range_minutes = time_range // 60
+    return f"Timetable for {stop_name} ({stop_id}) - Next {time_range_minutes} minutes:\n" + "\n".join(departures)
+
+
+async def _batch_stop_queries(stop_ids: list[str], limit: int) -> dict[str, dict] | None:
+    """Fetch departures for several stops in one aliased GraphQL request.
+
+    Builds { s0: stop(id: ...) {...} s1: ... } so N stops cost one round
+    trip instead of N. Callers must validate the IDs first; the aliases
+    map back to a {stop_id: stop_data} dict.
+    """
+    selections = []
+    for i, stop_id in enumerate(stop_ids):
+        selections.append(
+            f'''s{i}: stop(id: "{stop_id}") {{
         name
         gtfsId
-        stoptimesWithoutPatterns(
-          startTime: {start_time}
-          timeRange: {time_range}
-          numberOfDepartures: 50
-        ) {{
+        stoptimesWithoutPatterns(numberOfDepartures: {limit}) {{
           scheduledDeparture
-          realtimeDeparture
           departureDelay
-          realtime
           serviceDay
           headsign
           trip {{
             routeShortName
-            route {{
-              shortName
-              longName
-            }}
           }}
         }}
-      }}
-    }}
-    """
+      }}'''
+        )
+
+    query = "{\n      " + "\n      ".join(selections) + "\n    }"
 
     data = await make_graphql_request(query)
 
-    if not data or "data" not in data or not data["data"].get("stop"):
-        return f"Unable to fetch timetable for stop ID: {stop_id}"
+    if not data or "data" not in data:
+        return None
 
-    stop_data = data["data"]["stop"]
-    stop_name = stop_data.get("name", "Unknown stop")
-    stoptimes = stop_data.get("stoptimesWithoutPatterns", [])
+    return {stop_id: data["data"].get(f"s{i}") for i, stop_id in enumerate(stop_ids)}
 
-    if not stoptimes:
-        return f"No timetable entries found for stop: {stop_name} ({stop_id})"
 
-    # Get service day from first stoptime
-    service_day = stoptimes[0].get("serviceDay", 0)
+@mcp.tool()
+async def get_departures_multi(stop_ids: list[str], limit: int = 10) -> str:
+    """Get real-time departures for several Helsinki stops in a single request.
 
-    departures = [format_departure(st, service_day) for st in stoptimes]
+    Use this tool instead of calling get_departures repeatedly when you
+    already know multiple stop IDs; all stops are fetched in one round trip.
 
-    time_range_minutes = time_range // 60
-    return f"Timetable for {stop_name} ({stop_id}) - Next {time_range_minutes} minutes:\n" + "\n".join(departures)
+    Args:
+        stop_ids: List of stop IDs in HSL format (e.g., ["HSL:1040129", "HSL:1040602"]).
+        limit: Maximum number of departures to return per stop. Default is 10.
+
+    Returns:
+        A formatted string with a departures block per stop, in input order.
+    """
+    ids = [sid.strip() for sid in stop_ids if sid.strip()]
+    if not ids:
+        return "No stop IDs provided."
+
+    invalid = [sid for sid in ids if not _STOP_ID_RE.fullmatch(sid)]
+    if invalid:
+        return f"Invalid stop_id format: {', '.join(invalid)} (expected e.g. HSL:1040129)"
+
+    stops = await _batch_stop_queries(ids, limit)
+
+    if stops is None:
+        return f"Unable to fetch departures for stop IDs: {', '.join(ids)}"
+
+    sections = []
+    for stop_id in ids:
+        stop_data = stops.get(stop_id)
+        if not stop_data:
+            sections.append(f"Unable to fetch departures for stop ID: {stop_id}")
+            continue
+
+        stop_name = stop_data.get("name", "Unknown stop")
+        stoptimes = stop_data.get("stoptimesWithoutPatterns", [])
+
+        if not stoptimes:
+            sections.append(f"No departures found for stop: {stop_name} ({stop_id})")
+            continue
+
+        departures = [_fmt_stoptime(st, "dep") for st in stoptimes]
+        sections.append(f"Departures from {stop_name} ({stop_id}):\n" + "\n".join(departures))
+
+    return "\n\n".join(sections)
+
+
+@async_ttl_cache(maxsize=512, ttl=3600)
+async def _fetch_stop_info(stop_id: str) -> dict[str, Any] | None:
+    """Fetch one stop's static details; stop dicts cache for an hour,
+    failures return None and are retried on the next call."""
+    data = await make_graphql_request(_QUERY_STOP_INFO, {"id": stop_id})
+    if not data or "data" not in data or not data["data"].get("stop"):
+        return None
+    return data["data"]["stop"]
 
 
 @mcp.tool()
@@ -272,29 +488,14 @@ async def get_stop_info(stop_id: str) -> str:
         A formatted string with stop name, ID, code, description, coordinates,
         zone, and platform information.
     """
-    query = f"""
-    {{
-      stop(id: "{stop_id}") {{
-        name
-        gtfsId
-        code
-        desc
-        lat
-        lon
-        zoneId
-        locationType
-        platformCode
-      }}
-    }}
-    """
+    if not _STOP_ID_RE.fullmatch(stop_id):
+        return f"Invalid stop_id format: {stop_id} (expected e.g. HSL:1040129)"
 
-    data = await make_graphql_request(query)
+    stop = await _fetch_stop_info(stop_id)
 
-    if not data or "data" not in data or not data["data"].get("stop"):
+    if not stop:
         return f"Unable to fetch information for stop ID: {stop_id}"
 
-    stop = data["data"]["stop"]
-
     result = f"""Stop Information:
 Name: {stop.get('name', 'N/A')}
 GTFS ID: {stop.get('gtfsId', 'N/A')}
@@ -308,6 +509,108 @@ Platform: {stop.get('platformCode', 'N/A')}
     return result
 
 
+async def _name_search(query: str, limit: int) -> str | None:
+    """Search stops by name; return a formatted result block or None."""
+    data = await make_graphql_request(_QUERY_STOPS_BY_NAME, {"name": query})
+
+    if not data or "data" not in data:
+        return None
+
+    stops = data["data"].get("stops", [])
+
+    if not stops:
+        return None
+
+    # Limit results
+    stops = stops[:limit]
+
+    if len(stops) > 10:
+        # Keep the event loop free while large result sets are formatted
+        return await asyncio.to_thread(_format_name_results, stops, query)
+    return _format_name_results(stops, query)
+
+
+def _format_name_results(stops: list[dict], query: str) -> str:
+    """Render the result block for a name-based stop search."""
+    results = []
+    for stop in stops:
+        stop_id = stop.get("gtfsId", "N/A")
+        stop_name = stop.get("name", "N/A")
+        code = stop.get("code", "N/A")
+        desc = stop.get("desc", "N/A")
+        lat = stop.get("lat", "N/A")
+        lon = stop.get("lon", "N/A")
+
+        results.append(
+            f"ID: {stop_id}\n"
+            f"  Name: {stop_name}\n"
+            f"  Code: {code}\n"
+            f"  Location: {desc}\n"
+            f"  Coordinates: {lat}, {lon}"
+        )
+
+    header = f"Found {len(stops)} stop(s) matching '{query}':\n\n"
+    return header + "\n\n".join(results)
+
+
+async def _location_search(location_name: str, limit: int, radius: int) -> tuple[str | None, str | None]:
+    """Geocode a place name and list nearby stops.
+
+    Returns (result, error): a formatted block on success, otherwise an
+    error message naming the step that came up empty.
+    """
+    geocode_result = await geocode_location(location_name)
+    if not geocode_result:
+        return None, f"Unable to find location: {location_name}"
+
+    lat, lon, label = geocode_result
+
+    data = await make_graphql_request(
+        _QUERY_NEAREST, {"lat": lat, "lon": lon, "radius": radius, "n": limit}
+    )
+
+    no_stops = f"No stops found within {radius}m of: {location_name}"
+
+    if not data or "data" not in data or not data["data"].get("nearest"):
+        return None, no_stops
+
+    edges = data["data"]["nearest"].get("edges", [])
+
+    if not edges:
+        return None, no_stops
+
+    if len(edges) > 10:
+        return await asyncio.to_thread(_format_nearest_results, edges, label), None
+    return _format_nearest_results(edges, label), None
+
+
+def _format_nearest_results(edges: list[dict], label: str) -> str:
+    """Render the result block for a location-based stop search."""
+    results = []
+    for edge in edges:
+        node = edge["node"]
+        stop = node["place"]
+        distance = node["distance"]
+
+        stop_id = stop.get("gtfsId", "N/A")
+        stop_name = stop.get("name", "N/A")
+        code = stop.get("code", "N/A")
+        desc = stop.get("desc", "N/A")
+        stop_lat = stop.get("lat", "N/A")
+        stop_lon = stop.get("lon", "N/A")
+
+        results.append(
+            f"ID: {stop_id} ({distance}m away)\n"
+            f"  Name: {stop_name}\n"
+            f"  Code: {code}\n"
+            f"  Location: {desc}\n"
+            f"  Coordinates: {stop_lat}, {stop_lon}"
+        )
+
+    header = f"Found {len(edges)} stop(s) near {label}:\n\n"
+    return header + "\n\n".join(results)
+
+
 @mcp.tool()
 async def find_stop(query: str, limit: int = 10, radius: int = 500) -> str:
     """Find public transport stops by name or location in Helsinki area.
@@ -331,137 +634,33 @@ async def find_stop(query: str, limit: int = 10, radius: int = 500) -> str:
         For location searches, also includes distance in meters.
     """
     # Detect if this is a location-based query
-    location_patterns = [
-        r"(?:near|close to|around|by|at|in)\s+(.+)",
-        r"(.+?)\s+(?:area|vicinity|neighborhood)",
-        r"stops?\s+(?:near|around|at|in)\s+(.+)"
-    ]
-
+    match = _LOC_RE.search(query)
     location_name = None
-    for pattern in location_patterns:
-        match = re.search(pattern, query, re.IGNORECASE)
-        if match:
-            location_name = match.group(1).strip()
-            break
-
-    # If location-based query, use geocoding + nearest
+    if match:
+        location_name = (match.group("a") or match.group("b") or match.group("c")).strip()
+
+    # For location-style queries, run the geocode+nearest path and a plain
+    # name search concurrently, then pick deterministically: the
+    # distance-annotated location view wins whenever it succeeds, with the
+    # fuzzy name match only as a fallback. Awaiting both keeps the output
+    # independent of network timing while the round-trips still overlap.
     if location_name:
-        geocode_result = await geocode_location(location_name)
-        if not geocode_result:
-            return f"Unable to find location: {location_name}"
-
-        lat, lon, label = geocode_result
-
-        # Use the nearest query to find stops
-        graphql_query = f"""
-        {{
-          nearest(
-            lat: {lat},
-            lon: {lon},
-            maxDistance: {radius},
-            first: {limit},
-            filterByPlaceTypes: STOP
-          ) {{
-            edges {{
-              node {{
-                place {{
-                  ...on Stop {{
-                    gtfsId
-                    name
-                    code
-                    desc
-                    lat
-                    lon
-                  }}
-                }}
-                distance
-              }}
-            }}
-          }}
-        }}
-        """
-
-        data = await make_graphql_request(graphql_query)
-
-        if not data or "data" not in data or not data["data"].get("nearest"):
-            return f"Unable to find stops near: {label}"
-
-        edges = data["data"]["nearest"].get("edges", [])
+        name_result, (loc_result, loc_error) = await asyncio.gather(
+            _name_search(query, limit),
+            _location_search(location_name, limit, radius),
+        )
 
-        if not edges:
-            return f"No stops found within {radius}m of: {label}"
-
-        results = []
-        for edge in edges:
-            node = edge["node"]
-            stop = node["place"]
-            distance = node["distance"]
-
-            stop_id = stop.get("gtfsId", "N/A")
-            stop_name = stop.get("name", "N/A")
-            code = stop.get("code", "N/A")
-            desc = stop.get("desc", "N/A")
-            stop_lat = stop.get("lat", "N/A")
-            stop_lon = stop.get("lon", "N/A")
-
-            results.append(
-                f"ID: {stop_id} ({distance}m away)\n"
-                f"  Name: {stop_name}\n"
-                f"  Code: {code}\n"
-                f"  Location: {desc}\n"
-                f"  Coordinates: {stop_lat}, {stop_lon}"
-            )
-
-        header = f"Found {len(edges)} stop(s) near {label}:\n\n"
-        return header + "\n\n".join(results)
+        if loc_result:
+            return loc_result
+        if name_result:
+            return name_result
+        return loc_error
 
     # Otherwise, use name-based search
-    else:
-        graphql_query = f"""
-        {{
-          stops(name: "{query}") {{
-            gtfsId
-            name
-            code
-            desc
-            lat
-            lon
-          }}
-        }}
-        """
-
-        data = await make_graphql_request(graphql_query)
-
-        if not data or "data" not in data:
-            return f"Unable to search for stops with name: {query}"
-
-        stops = data["data"].get("stops", [])
-
-        if not stops:
-            return f"No stops found matching: {query}"
-
-        # Limit results
-        stops = stops[:limit]
-
-        results = []
-        for stop in stops:
-            stop_id = stop.get("gtfsId", "N/A")
-            stop_name = stop.get("name", "N/A")
-            code = stop.get("code", "N/A")
-            desc = stop.get("desc", "N/A")
-            lat = stop.get("lat", "N/A")
-            lon = stop.get("lon", "N/A")
-
-            results.append(
-                f"ID: {stop_id}\n"
-                f"  Name: {stop_name}\n"
-                f"  Code: {code}\n"
-                f"  Location: {desc}\n"
-                f"  Coordinates: {lat}, {lon}"
-            )
-
-        header = f"Found {len(stops)} stop(s) matching '{query}':\n\n"
-        return header + "\n\n".join(results)
+    result = await _name_search(query, limit)
+    if result:
+        return result
+    return f"Unable to find stops matching: {query}"
 
 
 if __name__ == "__main__":
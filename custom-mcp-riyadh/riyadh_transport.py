@@ -1,26 +1,114 @@
 from typing import Any, Optional, List
+import asyncio
+import functools
 import httpx
+import re
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from mcp.server.fastmcp import FastMCP
 
-mcp = FastMCP("riyadh-transport", host="0.0.0.0")
+# orjson decodes large number-heavy payloads noticeably faster than the
+# stdlib parser; fall back to stdlib json when it is not installed.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
+
+
+@asynccontextmanager
+async def _lifespan(_server):
+    """Close the shared HTTP client when the server shuts down."""
+    try:
+        yield
+    finally:
+        await _client.aclose()
+
+
+mcp = FastMCP("riyadh-transport", host="0.0.0.0", lifespan=_lifespan)
 
 RIYADH_API_BASE = "https://opendata.rcrc.gov.sa/api/explore/v2.1/catalog/datasets"
 DATASET_NAME = "bus-roads-by-direction-in-riyadh-2024"
 USER_AGENT = "riyadh-transport-mcp/1.0"
 
+# Shared HTTP client: one keep-alive connection pool for all OpenData calls
+# instead of a fresh TCP+TLS handshake per tool invocation.
+_client = httpx.AsyncClient(
+    http2=True,
+    timeout=30.0,
+    headers={"User-Agent": USER_AGENT, "Accept": "application/json"},
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+)
 
-async def make_transport_request(url: str) -> dict[str, Any] | None:
-    """Make a request to the Riyadh Transport API with proper error handling."""
-    headers = {"User-Agent": USER_AGENT, "Accept": "application/json"}
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, headers=headers, timeout=30.0)
+
+def async_ttl_cache(maxsize: int = 128, ttl: float = 3600):
+    """Cache coroutine results in-process for `ttl` seconds.
+
+    Bus route data changes rarely, so repeat lookups can skip the network.
+    Keyed on the argument tuple; oldest entry evicted at `maxsize`.
+    """
+    def decorator(func):
+        cache: dict[tuple, tuple[float, Any]] = {}
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            hit = cache.get(key)
+            if hit is not None and hit[0] > time.monotonic():
+                return hit[1]
+            value = await func(*args, **kwargs)
+            if value is not None:
+                if len(cache) >= maxsize:
+                    cache.pop(next(iter(cache)))
+                cache[key] = (time.monotonic() + ttl, value)
+            return value
+        return wrapper
+    return decorator
+
+
+# Route codes are short alphanumerics like "L19-1"; anything else would
+# only produce a where= clause the API rejects after a full round trip.
+_ROUTE_CODE_RE = re.compile(r"^[A-Za-z0-9\-]+$")
+
+# Scalar fields consumed by the formatters; list endpoints select only
+# these so the server never serializes the huge geoshape waypoint arrays.
+_SUMMARY_FIELDS = "busroute,busroutecode,direction,origin,destination,originar,destinationar"
+
+
+async def make_transport_request(url: str, params: dict[str, str] | None = None) -> dict[str, Any] | None:
+    """Make a request to the Riyadh Transport API with proper error handling.
+
+    Query parameters are passed through to httpx, which URL-encodes them
+    correctly (spaces, '&', '%', Arabic text) instead of the previous
+    hand-rolled string concatenation.
+    """
+    try:
+        # Stream the body so multi-MB route listings are consumed chunk by
+        # chunk as they arrive instead of buffered behind a single read.
+        async with _client.stream("GET", url, params=params) as response:
             response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"Error making request to {url}: {e}")
-            return None
+            chunks = [chunk async for chunk in response.aiter_bytes()]
+        return _json_loads(b"".join(chunks))
+    except Exception as e:
+        print(f"Error making request to {url}: {e}")
+        return None
+
+
+def _geoshape_endpoints(record: dict) -> tuple[Any, Any, int]:
+    """Walk a record's geoshape once and return (first, last, waypoint count).
+
+    Returns (None, None, 0) when the record has no coordinate list, e.g.
+    for list endpoints that select only the summary fields.
+    """
+    geometry = record.get("geoshape", {}).get("geometry")
+    if not geometry:
+        return (None, None, 0)
+    coordinates = geometry.get("coordinates")
+    if not coordinates:
+        return (None, None, 0)
+    return (coordinates[0], coordinates[-1], len(coordinates))
 
 
 def format_bus_route(record: dict) -> str:
@@ -37,52 +125,47 @@ def format_bus_route(record: dict) -> str:
     destination_ar = record.get("destinationar", "")
 
     # Geographic information - calculate center from geoshape if available
-    geoshape = record.get("geoshape", {})
+    first_coord, last_coord, waypoint_count = _geoshape_endpoints(record)
     lat, lon = "N/A", "N/A"
-    waypoint_count = 0
-
-    if geoshape and geoshape.get("geometry", {}).get("coordinates"):
-        coords = geoshape["geometry"]["coordinates"]
-        if coords:
-            waypoint_count = len(coords)
-            # Calculate approximate center from first and last coordinates
-            first_coord = coords[0]
-            last_coord = coords[-1]
-            lat = (first_coord[1] + last_coord[1]) / 2
-            lon = (first_coord[0] + last_coord[0]) / 2
+
+    if waypoint_count:
+        # Calculate approximate center from first and last coordinates
+        lat = (first_coord[1] + last_coord[1]) / 2
+        lon = (first_coord[0] + last_coord[0]) / 2
 
     # Comments
     comments_en = record.get("comments", "")
     comments_ar = record.get("commentsar", "")
 
-    # Format the output
-    route_info = f"🚌 Route {route_number} ({route_code}) - Direction {direction}\n"
+    # Collect the output pieces and join once; repeated str += reallocates
+    # the whole string on every append.
+    parts = [f"🚌 Route {route_number} ({route_code}) - Direction {direction}\n"]
 
     # Add origin with Arabic if available
-    route_info += f"📍 From: {origin_en}"
+    parts.append(f"📍 From: {origin_en}")
     if origin_ar and origin_ar != "NA":
-        route_info += f" ({origin_ar})"
-    route_info += "\n"
+        parts.append(f" ({origin_ar})")
+    parts.append("\n")
 
     # Add destination with Arabic if available
-    route_info += f"🎯 To: {destination_en}"
+    parts.append(f"🎯 To: {destination_en}")
     if destination_ar and destination_ar != "NA":
-        route_info += f" ({destination_ar})"
-    route_info += "\n"
+        parts.append(f" ({destination_ar})")
+    parts.append("\n")
 
     # Add geographic information
-    route_info += f"🌍 Center Point: {lat}, {lon}\n"
+    parts.append(f"🌍 Center Point: {lat}, {lon}\n")
 
     if waypoint_count > 0:
-        route_info += f"🗺️ Route has {waypoint_count} GPS waypoints\n"
+        parts.append(f"🗺️ Route has {waypoint_count} GPS waypoints\n")
 
     # Add comments if available
     if comments_en and comments_en != "":
-        route_info += f"💬 Notes: {comments_en}\n"
+        parts.append(f"💬 Notes: {comments_en}\n")
     if comments_ar and comments_ar != "":
-        route_info += f"💬 Notes (AR): {comments_ar}\n"
+        parts.append(f"💬 Notes (AR): {comments_ar}\n")
 
-    return route_info.rstrip()
+    return "".join(parts).rstrip()
 
 
 def format_route_summary(routes: List[dict]) -> str:
@@ -121,33 +204,34 @@ async def search_bus_routes(
         limit: Maximum number of results to return (default: 10)
     """
     # Build query parameters
-    params = {"limit": str(limit)}
+    params = {"limit": str(limit), "select": _SUMMARY_FIELDS}
 
     # Build search criteria
     where_clauses = []
 
+    # Exact match on the indexed route number stays a where= clause; the
+    # fuzzy criteria use ODSQL search() / q=, which hit the server's
+    # inverted index instead of scanning every record with LIKE.
     if route_number:
         where_clauses.append(f"busroute = '{route_number}'")
 
     if origin:
-        where_clauses.append(f"origin LIKE '%{origin}%'")
+        where_clauses.append(f'search(origin, "{origin}")')
 
     if destination:
-        where_clauses.append(f"destination LIKE '%{destination}%'")
+        where_clauses.append(f'search(destination, "{destination}")')
 
     if query:
-        # General search across multiple fields
-        general_search = f"(origin LIKE '%{query}%' OR destination LIKE '%{query}%' OR busroutecode LIKE '%{query}%')"
-        where_clauses.append(general_search)
+        # General search across all text fields
+        params["q"] = query
 
     if where_clauses:
         params["where"] = " AND ".join(where_clauses)
 
     # Make API request
-    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-    url = f"{RIYADH_API_BASE}/{DATASET_NAME}/records?{query_string}"
+    url = f"{RIYADH_API_BASE}/{DATASET_NAME}/records"
 
-    data = await make_transport_request(url)
+    data = await make_transport_request(url, params)
 
     if not data:
         return "Unable to fetch bus route data from Riyadh transport API."
@@ -173,8 +257,22 @@ async def search_bus_routes(
     header = f"Riyadh Bus Routes (showing {len(results)} of {total_count} total routes):\n\n"
 
     if len(results) == 1:
-        # Show detailed information for single result
+        # The summary projection has no geoshape, but the detailed view
+        # shows the center point and waypoint count; re-fetch the full
+        # record for this one route before formatting it
+        route_code = results[0].get("busroutecode")
+        if route_code and _ROUTE_CODE_RE.fullmatch(route_code):
+            detail_data = await make_transport_request(
+                url, {"where": f"busroutecode = '{route_code}'", "limit": "1"}
+            )
+            detail_results = detail_data.get("results") if detail_data else None
+            if detail_results:
+                return header + format_bus_route(detail_results[0])
         return header + format_bus_route(results[0])
+    elif len(results) > 10:
+        # Big batches format off the event loop so concurrent tool calls
+        # are not blocked behind string assembly
+        return header + await asyncio.to_thread(format_route_summary, results)
     else:
         # Show summary for multiple results
         return header + format_route_summary(results)
@@ -187,15 +285,17 @@ async def get_route_details(route_code: str) -> str:
     Args:
         route_code: The bus route code (e.g., "L19-1")
     """
+    if not _ROUTE_CODE_RE.fullmatch(route_code):
+        return f"Invalid route code format: {route_code} (expected e.g. L19-1)"
+
     params = {
         "where": f"busroutecode = '{route_code}'",
         "limit": "1"
     }
 
-    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-    url = f"{RIYADH_API_BASE}/{DATASET_NAME}/records?{query_string}"
+    url = f"{RIYADH_API_BASE}/{DATASET_NAME}/records"
 
-    data = await make_transport_request(url)
+    data = await make_transport_request(url, params)
 
     if not data:
         return f"Unable to fetch details for route {route_code}."
@@ -211,18 +311,27 @@ async def get_route_details(route_code: str) -> str:
     route_info = format_bus_route(route)
 
     # Add geographic route information if available
-    geoshape = route.get("geoshape", {})
-    if geoshape and geoshape.get("geometry", {}).get("coordinates"):
-        coordinates = geoshape["geometry"]["coordinates"]
-        if coordinates and len(coordinates) >= 2:
-            start_coord = coordinates[0]
-            end_coord = coordinates[-1]
-            route_info += f"\n📍 Start GPS: {start_coord[1]:.6f}, {start_coord[0]:.6f}"
-            route_info += f"\n🏁 End GPS: {end_coord[1]:.6f}, {end_coord[0]:.6f}"
+    start_coord, end_coord, waypoint_count = _geoshape_endpoints(route)
+    if waypoint_count >= 2:
+        route_info += f"\n📍 Start GPS: {start_coord[1]:.6f}, {start_coord[0]:.6f}"
+        route_info += f"\n🏁 End GPS: {end_coord[1]:.6f}, {end_coord[0]:.6f}"
 
     return route_info
 
 
+@async_ttl_cache(maxsize=128, ttl=3600)
+async def _fetch_route_list(limit: int) -> dict[str, Any] | None:
+    """Fetch the route listing page through the hour-long cache.
+
+    Caching the fetch instead of the tool keeps the None-on-failure
+    contract: an upstream blip is retried next call, not cached for an
+    hour as an error string.
+    """
+    params = {"limit": str(limit), "select": _SUMMARY_FIELDS}
+    url = f"{RIYADH_API_BASE}/{DATASET_NAME}/records"
+    return await make_transport_request(url, params)
+
+
 @mcp.tool()
 async def list_all_routes(limit: int = 20) -> str:
     """List all available bus routes in Riyadh.
@@ -230,12 +339,7 @@ async def list_all_routes(limit: int = 20) -> str:
     Args:
         limit: Maximum number of routes to return (default: 20)
     """
-    params = {"limit": str(limit)}
-
-    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-    url = f"{RIYADH_API_BASE}/{DATASET_NAME}/records?{query_string}"
-
-    data = await make_transport_request(url)
+    data = await _fetch_route_list(limit)
 
     if not data:
         return "Unable to fetch bus routes from Riyadh transport API."
@@ -248,9 +352,25 @@ async def list_all_routes(limit: int = 20) -> str:
 
     header = f"Riyadh Public Bus Routes (showing {len(results)} of {total_count} total routes):\n\n"
 
+    if len(results) > 10:
+        return header + await asyncio.to_thread(format_route_summary, results)
     return header + format_route_summary(results)
 
 
+@async_ttl_cache(maxsize=128, ttl=3600)
+async def _fetch_area_routes(area_name: str, limit: int) -> dict[str, Any] | None:
+    """Fetch routes matching an area query; failures return None uncached."""
+    # Full-text search covers origin and destination via the server-side
+    # index; no LIKE scan over the whole dataset
+    params = {
+        "q": area_name,
+        "limit": str(limit),
+        "select": _SUMMARY_FIELDS
+    }
+    url = f"{RIYADH_API_BASE}/{DATASET_NAME}/records"
+    return await make_transport_request(url, params)
+
+
 @mcp.tool()
 async def search_routes_by_area(area_name: str, limit: int = 10) -> str:
     """Search for bus routes that serve a specific area or neighborhood in Riyadh.
@@ -259,16 +379,7 @@ async def search_routes_by_area(area_name: str, limit: int = 10) -> str:
         area_name: Name of the area or neighborhood to search for
         limit: Maximum number of routes to return (default: 10)
     """
-    # Search in both origin and destination fields for the area name
-    params = {
-        "where": f"(origin LIKE '%{area_name}%' OR destination LIKE '%{area_name}%')",
-        "limit": str(limit)
-    }
-
-    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-    url = f"{RIYADH_API_BASE}/{DATASET_NAME}/records?{query_string}"
-
-    data = await make_transport_request(url)
+    data = await _fetch_area_routes(area_name, limit)
 
     if not data:
         return f"Unable to search for routes serving {area_name}."
@@ -281,6 +392,8 @@ async def search_routes_by_area(area_name: str, limit: int = 10) -> str:
 
     header = f"Bus routes serving '{area_name}' (found {len(results)} routes):\n\n"
 
+    if len(results) > 10:
+        return header + await asyncio.to_thread(format_route_summary, results)
     return header + format_route_summary(results)
 
 
@@ -1,81 +1,176 @@
 from typing import Any, Optional
+import asyncio
 import httpx
 import os
+import logging
+import queue
+import time
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+from itertools import islice
 from datetime import datetime
 from mcp.server.fastmcp import FastMCP
 
-mcp = FastMCP("stockholm-transport", host="0.0.0.0")
+# orjson parses bytes straight off the wire roughly twice as fast as the
+# stdlib json path; degrade to stdlib when it is missing.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
+
+
+# Errors log through a queue so a burst of failures never blocks the
+# event loop on synchronous stdio writes; a listener thread drains it.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+logger = logging.getLogger("stockholm-transport")
+logger.addHandler(QueueHandler(_log_queue))
+logger.setLevel(logging.INFO)
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+
+
+@asynccontextmanager
+async def _lifespan(_server):
+    """Close the shared HTTP client when the server shuts down."""
+    try:
+        yield
+    finally:
+        await _client.aclose()
+        _log_listener.stop()
+
+
+mcp = FastMCP("stockholm-transport", host="0.0.0.0", lifespan=_lifespan)
 
 TRANSPORT_API_BASE = "https://realtime-api.trafiklab.se/v1"
 TRANSPORT_API_KEY = os.getenv("TRANSPORT_API_KEY", "your_key")
 STOCKHOLM_AREA_ID = os.getenv("STOCKHOLM_AREA_ID", "740098000")
 USER_AGENT = "stockholm-transport-mcp/1.0"
 
+# One shared client so repeated board queries reuse a warm keep-alive
+# connection instead of paying a TCP+TLS handshake each call.
+_HEADERS = {"User-Agent": USER_AGENT, "Accept": "application/json"}
+
+# URLs for the default area are precomputed; only non-default areas pay
+# the f-string interpolation per call
+_DEFAULT_DEP_URL = f"{TRANSPORT_API_BASE}/departures/{STOCKHOLM_AREA_ID}?key={TRANSPORT_API_KEY}"
+_DEFAULT_ARR_URL = f"{TRANSPORT_API_BASE}/arrivals/{STOCKHOLM_AREA_ID}?key={TRANSPORT_API_KEY}"
+
+_client = httpx.AsyncClient(
+    http2=True,
+    timeout=30.0,
+    headers=_HEADERS,
+    limits=httpx.Limits(
+        max_keepalive_connections=20, max_connections=100, keepalive_expiry=30.0
+    ),
+)
+
+
+# Board queries for the same area arrive in bursts; a short URL-keyed TTL
+# cache answers repeats from memory, and the in-flight table lets
+# concurrent callers share one upstream request instead of stampeding.
+_CACHE_TTL = 10.0
+_CACHE_MAXSIZE = 128
+_cache: dict[str, tuple[float, dict]] = {}
+_inflight: dict[str, asyncio.Future] = {}
+
 
 async def make_transport_request(url: str) -> dict[str, Any] | None:
-    """Make a request to the Stockholm Transport API with proper error handling."""
-    headers = {"User-Agent": USER_AGENT, "Accept": "application/json"}
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, headers=headers, timeout=30.0)
+    """Make a request to the Stockholm Transport API with proper error handling.
+
+    Responses are cached per URL for a few seconds, and concurrent calls
+    for the same URL await a single shared request.
+    """
+    hit = _cache.get(url)
+    if hit is not None and time.monotonic() - hit[0] < _CACHE_TTL:
+        return hit[1]
+
+    pending = _inflight.get(url)
+    if pending is not None:
+        return await pending
+
+    future: asyncio.Future = asyncio.get_running_loop().create_future()
+    _inflight[url] = future
+    try:
+        # aread() hands orjson the raw bytes without httpx's intermediate
+        # text decode
+        async with _client.stream("GET", url) as response:
             response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"Error making request to {url}: {e}")
-            return None
+            data = _json_loads(await response.aread())
+        # Evict the oldest entry at the bound so the cache cannot grow
+        # without limit on a long-running server
+        if len(_cache) >= _CACHE_MAXSIZE and url not in _cache:
+            _cache.pop(next(iter(_cache)))
+        _cache[url] = (time.monotonic(), data)
+        future.set_result(data)
+        return data
+    except Exception:
+        logger.exception("Error making request to %s", url)
+        future.set_result(None)
+        return None
+    finally:
+        # Cancellation skips both arms above; cancel the future too so
+        # piggybacked waiters are woken instead of hanging forever
+        if not future.done():
+            future.cancel()
+        del _inflight[url]
+
+
+# Line templates indexed by bool(delay); str.format ignores the unused
+# delay kwarg, so the per-record branch disappears
+_DEP_FMTS = (
+    "{t} - {mode} {line} to {dest}".format,
+    "{t} (+{d}min) - {mode} {line} to {dest}".format,
+)
+_ARR_FMTS = (
+    "{t} - {mode} {line} from {origin}".format,
+    "{t} (+{d}min) - {mode} {line} from {origin}".format,
+)
 
 
 def format_departure(departure: dict) -> str:
     """Format a departure into a readable string."""
-    stop = departure.get("stop", {})
-    stop_name = stop.get("name", "Unknown stop")
-
-    route = departure.get("route", {})
+    # Bind .get once and read only the fields that end up in the output
+    get = departure.get
+    route = get("route", {})
     line_designation = route.get("designation", "")
     destination = route.get("direction", "Unknown destination")
     transport_mode = route.get("transport_mode", "")
 
-    scheduled = departure.get("scheduled", "")
-    realtime = departure.get("realtime", "")
-    delay = departure.get("delay", 0)
-
-    # Format time (extract HH:MM from ISO timestamp)
-    scheduled_time = scheduled.split("T")[1][:5] if "T" in scheduled else scheduled
+    scheduled = get("scheduled", "")
+    delay = get("delay", 0)
 
-    # Format time with delay if applicable
-    if delay > 0:
-        time_info = f"{scheduled_time} (+{delay//60}min)"
-    else:
-        time_info = scheduled_time
+    # Trafiklab timestamps are fixed-format YYYY-MM-DDTHH:MM:SS; slice the
+    # HH:MM out directly instead of scanning and splitting the string
+    scheduled_time = scheduled[11:16] if len(scheduled) >= 16 and scheduled[10] == "T" else scheduled
 
-    return f"{time_info} - {transport_mode} {line_designation} to {destination}"
+    return _DEP_FMTS[delay > 0](
+        t=scheduled_time, d=delay // 60, mode=transport_mode,
+        line=line_designation, dest=destination
+    )
 
 
 def format_arrival(arrival: dict) -> str:
     """Format an arrival into a readable string."""
-    stop = arrival.get("stop", {})
-    stop_name = stop.get("name", "Unknown stop")
-
-    route = arrival.get("route", {})
+    get = arrival.get
+    route = get("route", {})
     line_designation = route.get("designation", "")
     origin_dest = route.get("origin", {})
     origin = origin_dest.get("name", "Unknown origin") if isinstance(origin_dest, dict) else origin_dest
     transport_mode = route.get("transport_mode", "")
 
-    scheduled = arrival.get("scheduled", "")
-    realtime = arrival.get("realtime", "")
-    delay = arrival.get("delay", 0)
+    scheduled = get("scheduled", "")
+    delay = get("delay", 0)
 
-    # Format time (extract HH:MM from ISO timestamp)
-    scheduled_time = scheduled.split("T")[1][:5] if "T" in scheduled else scheduled
+    # Trafiklab timestamps are fixed-format YYYY-MM-DDTHH:MM:SS; slice the
+    # HH:MM out directly instead of scanning and splitting the string
+    scheduled_time = scheduled[11:16] if len(scheduled) >= 16 and scheduled[10] == "T" else scheduled
 
-    # Format time with delay if applicable
-    if delay > 0:
-        time_info = f"{scheduled_time} (+{delay//60}min)"
-    else:
-        time_info = scheduled_time
-
-    return f"{time_info} - {transport_mode} {line_designation} from {origin}"
+    return _ARR_FMTS[delay > 0](
+        t=scheduled_time, d=delay // 60, mode=transport_mode,
+        line=line_designation, origin=origin
+    )
 
 
 @mcp.tool()
@@ -89,19 +184,25 @@ async def get_departures(
         area_id: Area ID for the location (default: Stockholm area 740098000)
         limit: Maximum number of departures to return (default: 10)
     """
-    url = f"{TRANSPORT_API_BASE}/departures/{area_id}?key={TRANSPORT_API_KEY}"
+    if area_id == STOCKHOLM_AREA_ID:
+        url = _DEFAULT_DEP_URL
+    else:
+        url = f"{TRANSPORT_API_BASE}/departures/{area_id}?key={TRANSPORT_API_KEY}"
 
     data = await make_transport_request(url)
 
-    if not data or "departures" not in data:
+    deps = data.get("departures") if data else None
+
+    if deps is None:
         return "Unable to fetch departures or no departures found."
 
-    if not data["departures"]:
+    if not deps:
         return f"No departures found for area ID: {area_id}"
 
-    departures = [format_departure(dep) for dep in data["departures"][:limit]]
+    # islice caps the count without copying the list like [:limit] would
+    departures = "\n".join(map(format_departure, islice(deps, limit)))
 
-    return f"Departures for area {area_id}:\n" + "\n".join(departures)
+    return f"Departures for area {area_id}:\n{departures}"
 
 
 @mcp.tool()
@@ -115,19 +216,24 @@ async def get_arrivals(
         area_id: Area ID for the location (default: Stockholm area 740098000)
         limit: Maximum number of arrivals to return (default: 10)
     """
-    url = f"{TRANSPORT_API_BASE}/arrivals/{area_id}?key={TRANSPORT_API_KEY}"
+    if area_id == STOCKHOLM_AREA_ID:
+        url = _DEFAULT_ARR_URL
+    else:
+        url = f"{TRANSPORT_API_BASE}/arrivals/{area_id}?key={TRANSPORT_API_KEY}"
 
     data = await make_transport_request(url)
 
-    if not data or "arrivals" not in data:
+    arrs = data.get("arrivals") if data else None
+
+    if arrs is None:
         return "Unable to fetch arrivals or no arrivals found."
 
-    if not data["arrivals"]:
+    if not arrs:
         return f"No arrivals found for area ID: {area_id}"
 
-    arrivals = [format_arrival(arr) for arr in data["arrivals"][:limit]]
+    arrivals = "\n".join(map(format_arrival, islice(arrs, limit)))
 
-    return f"Arrivals for area {area_id}:\n" + "\n".join(arrivals)
+    return f"Arrivals for area {area_id}:\n{arrivals}"
 
 
 @mcp.tool()
@@ -141,8 +247,10 @@ async def get_departures_and_arrivals(
         area_id: Area ID for the location (default: Stockholm area 740098000)
         limit: Maximum number of departures/arrivals to return (default: 10)
     """
-    departures_result = await get_departures(area_id, limit)
-    arrivals_result = await get_arrivals(area_id, limit)
+    # The two endpoints are independent, so fetch them concurrently
+    departures_result, arrivals_result = await asyncio.gather(
+        get_departures(area_id, limit), get_arrivals(area_id, limit)
+    )
 
     return f"{departures_result}\n\n{arrivals_result}"
 
@@ -47,17 +47,22 @@ async def main():
     print("Stockholm Transport MCP Server Test Suite")
     print("="*50)
 
-    try:
-        await test_get_departures()
-        await test_get_arrivals()
-        await test_get_departures_and_arrivals()
-
-        print("✅ All tests completed successfully!")
-
-    except Exception as e:
-        print(f"❌ Test failed with error: {e}")
+    # The tests only hit independent endpoints, so run them concurrently;
+    # the suite finishes in the time of the slowest one
+    results = await asyncio.gather(
+        test_get_departures(),
+        test_get_arrivals(),
+        test_get_departures_and_arrivals(),
+        return_exceptions=True,
+    )
+
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if failures:
+        for error in failures:
+            print(f"❌ Test failed with error: {error}")
         return 1
 
+    print("✅ All tests completed successfully!")
     return 0
 
 
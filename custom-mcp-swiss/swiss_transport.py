@@ -1,54 +1,157 @@
 from typing import Any, Optional
+import asyncio
 import httpx
+import re
+import logging
+import queue
+import time
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from mcp.server.fastmcp import FastMCP
 
-mcp = FastMCP("swiss-transport", host="0.0.0.0")
+# Prefer orjson for decoding — it takes response bytes directly and is
+# about 2x faster than stdlib json, which stays as the fallback.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
+
+
+# Queue-backed logging: emit is an O(1) enqueue on the event loop and
+# a background listener thread does the actual stderr writes.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+logger = logging.getLogger("swiss-transport")
+logger.addHandler(QueueHandler(_log_queue))
+logger.setLevel(logging.INFO)
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+
+
+@asynccontextmanager
+async def _lifespan(_server):
+    """Close the shared HTTP client when the server shuts down."""
+    try:
+        yield
+    finally:
+        await _client.aclose()
+        _log_listener.stop()
+
+
+mcp = FastMCP("swiss-transport", host="0.0.0.0", lifespan=_lifespan)
 
 TRANSPORT_API_BASE = "http://transport.opendata.ch/v1"
 USER_AGENT = "swiss-transport-mcp/1.0"
 
+# One shared client so every tool call reuses a warm keep-alive
+# connection instead of opening a fresh socket. The opendata.ch endpoint
+# is plain HTTP, so http2 only kicks in if the base URL moves to HTTPS.
+_HEADERS = {"User-Agent": USER_AGENT, "Accept": "application/json"}
+
+_client = httpx.AsyncClient(
+    http2=True,
+    timeout=30.0,
+    headers=_HEADERS,
+    limits=httpx.Limits(
+        max_keepalive_connections=20, max_connections=100, keepalive_expiry=30.0
+    ),
+)
+
 
-async def make_transport_request(url: str) -> dict[str, Any] | None:
-    """Make a request to the Swiss Transport API with proper error handling."""
-    headers = {"User-Agent": USER_AGENT, "Accept": "application/json"}
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, headers=headers, timeout=30.0)
+# Identical queries tend to repeat within seconds (the model often
+# re-asks for the same board); cache responses briefly per URL and let
+# concurrent callers piggyback on a single in-flight request.
+_CACHE_TTL = 10.0
+_CACHE_MAXSIZE = 256
+_cache: dict[tuple, tuple[float, dict]] = {}
+_inflight: dict[tuple, asyncio.Future] = {}
+
+
+async def make_transport_request(url: str, params: dict[str, str] | None = None) -> dict[str, Any] | None:
+    """Make a request to the Swiss Transport API with proper error handling.
+
+    Query parameters go straight to httpx, which percent-encodes station
+    names ("Zürich HB") correctly. Carries a short TTL cache keyed on
+    (url, params) with single-flight coalescing of concurrent requests.
+    """
+    key = (url, tuple(sorted(params.items())) if params else None)
+
+    hit = _cache.get(key)
+    if hit is not None and time.monotonic() - hit[0] < _CACHE_TTL:
+        return hit[1]
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        return await pending
+
+    future: asyncio.Future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        # Read the body as bytes under stream() so orjson parses straight
+        # off the wire with no str round-trip
+        async with _client.stream("GET", url, params=params) as response:
             response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"Error making request to {url}: {e}")
-            return None
+            data = _json_loads(await response.aread())
+        # Connection searches produce high-cardinality keys, so cap the
+        # cache and drop the oldest entry once the bound is reached
+        if len(_cache) >= _CACHE_MAXSIZE and key not in _cache:
+            _cache.pop(next(iter(_cache)))
+        _cache[key] = (time.monotonic(), data)
+        future.set_result(data)
+        return data
+    except Exception:
+        logger.exception("Error making request to %s", url)
+        future.set_result(None)
+        return None
+    finally:
+        # Cancellation skips both arms above; cancel the future too so
+        # piggybacked waiters are woken instead of hanging forever
+        if not future.done():
+            future.cancel()
+        del _inflight[key]
+
+
+# One-pass duration cleanup: strips "00d" and turns ":00" into " hours ",
+# matching the old chained str.replace calls (the trailing
+# .replace(':', ':') was a no-op and is gone)
+_DUR_RE = re.compile(r"00d|:00")
+
+_CONN_FMT = """
+    From: {from_station} at {departure}{delay_info}{platform_info}
+    To: {to_station} at {arrival}
+    Duration: {duration}
+    Transfers: {transfers}
+    Transport: {products}
+    """.format
 
 
 def format_connection(connection: dict) -> str:
     """Format a connection into a readable string."""
-    from_station = connection["from"]["station"]["name"]
-    to_station = connection["to"]["station"]["name"]
-    departure = connection["from"]["departure"]
-    arrival = connection["to"]["arrival"]
-    duration = connection["duration"]
-    transfers = connection["transfers"]
-    products = ", ".join(connection["products"])
+    conn_from = connection["from"]
 
     # Format delay information if available
     delay_info = ""
-    if connection["from"].get("delay"):
-        delay_info = f" (Delay: {connection['from']['delay']} min)"
+    if conn_from.get("delay"):
+        delay_info = f" (Delay: {conn_from['delay']} min)"
 
     # Format platform information
     platform_info = ""
-    if connection["from"].get("platform"):
-        platform_info = f" Platform: {connection['from']['platform']}"
-
-    return f"""
-    From: {from_station} at {departure}{delay_info}{platform_info}
-    To: {to_station} at {arrival}
-    Duration: {duration.replace('00d', '').replace(':00', ' hours ').replace(':', ':')}
-    Transfers: {transfers}
-    Transport: {products}
-    """
+    if conn_from.get("platform"):
+        platform_info = f" Platform: {conn_from['platform']}"
+
+    return _CONN_FMT(
+        from_station=conn_from["station"]["name"],
+        departure=conn_from["departure"],
+        delay_info=delay_info,
+        platform_info=platform_info,
+        to_station=connection["to"]["station"]["name"],
+        arrival=connection["to"]["arrival"],
+        duration=_DUR_RE.sub(lambda m: "" if m.group() == "00d" else " hours ", connection["duration"]),
+        transfers=connection["transfers"],
+        products=", ".join(connection["products"]),
+    )
 
 
 def format_location(location: dict) -> str:
@@ -56,6 +159,22 @@ def format_location(location: dict) -> str:
     return f"{location['name']} (ID: {location['id']}) - {location.get('coordinate', {}).get('x', 'N/A')}, {location.get('coordinate', {}).get('y', 'N/A')}"
 
 
+def format_stationboard_entry(departure: dict) -> str:
+    """Format a single stationboard departure into a readable string."""
+    stop = departure.get("stop", {})
+    time = stop.get("departure", "N/A")
+    destination = departure.get("to", "Unknown destination")
+    category = departure.get("category", "")
+    number = departure.get("number", "")
+    platform = stop.get("platform", "")
+    delay = stop.get("delay", 0)
+
+    delay_text = f" (+{delay} min)" if delay else ""
+    platform_text = f" Pl. {platform}" if platform else ""
+
+    return f"{time}{delay_text} - {category} {number} to {destination}{platform_text}"
+
+
 @mcp.tool()
 async def search_connections(
     from_location: str,
@@ -84,21 +203,37 @@ async def search_connections(
     if time:
         params["time"] = time
 
-    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-    url = f"{TRANSPORT_API_BASE}/connections?{query_string}"
-
-    data = await make_transport_request(url)
-
-    if not data or "connections" not in data:
+    url = f"{TRANSPORT_API_BASE}/connections"
+
+    # Free-text origins (no digits, so not a station ID) get a sanity
+    # check against /locations, run concurrently with the connection
+    # query so the extra round trip hides under the main one.
+    if not any(c.isdigit() for c in from_location):
+        async with asyncio.TaskGroup() as tg:
+            conn_task = tg.create_task(make_transport_request(url, params))
+            loc_task = tg.create_task(make_transport_request(
+                f"{TRANSPORT_API_BASE}/locations",
+                {"query": from_location, "limit": "1"},
+            ))
+
+        loc_data = loc_task.result()
+        if loc_data is not None and not loc_data.get("stations"):
+            return f"No station found matching: {from_location}"
+        data = conn_task.result()
+    else:
+        data = await make_transport_request(url, params)
+
+    conns = data.get("connections") if data else None
+
+    if conns is None:
         return "Unable to fetch connections or no connections found."
 
-    if not data["connections"]:
+    if not conns:
         return f"No connections found from {from_location} to {to_location}."
 
-    connections = [format_connection(conn) for conn in data["connections"]]
+    connections = "\n---\n".join(map(format_connection, conns))
 
-    header = f"Connections from {data['from']['name']} to {data['to']['name']}:\n"
-    return header + "\n---\n".join(connections)
+    return f"Connections from {data['from']['name']} to {data['to']['name']}:\n{connections}"
 
 
 @mcp.tool()
@@ -114,19 +249,20 @@ async def search_locations(query: str, limit: int = 10) -> str:
         "limit": str(limit)
     }
 
-    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-    url = f"{TRANSPORT_API_BASE}/locations?{query_string}"
+    url = f"{TRANSPORT_API_BASE}/locations"
 
-    data = await make_transport_request(url)
+    data = await make_transport_request(url, params)
 
-    if not data or "stations" not in data:
+    stations = data.get("stations") if data else None
+
+    if stations is None:
         return "Unable to fetch locations or no locations found."
 
-    if not data["stations"]:
+    if not stations:
         return f"No locations found for query: {query}"
 
-    locations = [format_location(station) for station in data["stations"]]
-    return f"Locations matching '{query}':\n" + "\n".join(locations)
+    locations = "\n".join(map(format_location, stations))
+    return f"Locations matching '{query}':\n{locations}"
 
 
 @mcp.tool()
@@ -150,33 +286,22 @@ async def get_stationboard(
     if transportation_types:
         params["transportations"] = transportation_types
 
-    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-    url = f"{TRANSPORT_API_BASE}/stationboard?{query_string}"
+    url = f"{TRANSPORT_API_BASE}/stationboard"
+
+    data = await make_transport_request(url, params)
 
-    data = await make_transport_request(url)
+    board = data.get("stationboard") if data else None
 
-    if not data or "stationboard" not in data:
+    if board is None:
         return "Unable to fetch station board or no departures found."
 
-    if not data["stationboard"]:
+    if not board:
         return f"No departures found for station: {station}"
 
-    departures = []
-    for departure in data["stationboard"]:
-        time = departure.get("stop", {}).get("departure", "N/A")
-        destination = departure.get("to", "Unknown destination")
-        category = departure.get("category", "")
-        number = departure.get("number", "")
-        platform = departure.get("stop", {}).get("platform", "")
-        delay = departure.get("stop", {}).get("delay", 0)
-
-        delay_text = f" (+{delay} min)" if delay else ""
-        platform_text = f" Pl. {platform}" if platform else ""
-
-        departures.append(f"{time}{delay_text} - {category} {number} to {destination}{platform_text}")
+    departures = "\n".join(map(format_stationboard_entry, board))
 
     station_name = data.get("station", {}).get("name", station)
-    return f"Departures from {station_name}:\n" + "\n".join(departures)
+    return f"Departures from {station_name}:\n{departures}"
 
 
 if __name__ == "__main__":
@@ -52,17 +52,21 @@ async def main():
     print("Swiss Transport MCP Server Test Suite")
     print("="*50)
 
-    try:
-        await test_search_locations()
-        await test_search_connections()
-        await test_get_stationboard()
-
-        print("✅ All tests completed successfully!")
-
-    except Exception as e:
-        print(f"❌ Test failed with error: {e}")
+    # Independent network calls — run the whole suite concurrently
+    results = await asyncio.gather(
+        test_search_locations(),
+        test_search_connections(),
+        test_get_stationboard(),
+        return_exceptions=True,
+    )
+
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if failures:
+        for error in failures:
+            print(f"❌ Test failed with error: {error}")
         return 1
 
+    print("✅ All tests completed successfully!")
     return 0
 
 
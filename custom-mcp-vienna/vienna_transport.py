@@ -1,135 +1,299 @@
 from typing import Any, Optional
+import asyncio
 import httpx
-from datetime import datetime
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from itertools import islice
 from mcp.server.fastmcp import FastMCP
 
-mcp = FastMCP("vienna-transport", host="0.0.0.0")
+# Monitor payloads are dense nests of small objects where orjson decodes
+# about twice as fast as stdlib json; keep stdlib as the fallback.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
+
+
+@asynccontextmanager
+async def _lifespan(_server):
+    """Close the shared HTTP client when the server shuts down."""
+    try:
+        yield
+    finally:
+        await _CLIENT.aclose()
+
+
+mcp = FastMCP("vienna-transport", host="0.0.0.0", lifespan=_lifespan)
+
+_log = logging.getLogger(__name__)
 
 WIENER_LINIEN_API_BASE = "https://www.wienerlinien.at/ogd_realtime"
 USER_AGENT = "vienna-transport-mcp/1.0"
 
+# Separator rendered between monitors in multi-station output
+_MONITOR_SEP = "\n\n" + "=" * 80 + "\n\n"
+
+# Static halves of the station-search guidance; only the two station-name
+# interpolations are rebuilt per call
+_SEARCH_HEAD = """
+To find RBL numbers for Vienna stations:
+
+1. Visit: https://www.wienerlinien.at/ogd_realtime/
+2. Look for station lists or use the official Wiener Linien app
+3. Common stations and their RBL numbers:
+   - Stephansplatz U1: 4201
+   - Karlsplatz U1: 4205
+   - Schwedenplatz U1: 4202
+   - Westbahnhof U3: 4301
+   - Kagran U1: 4127
+   - Schottentor U2: 4021
+
+"""
+
+_SEARCH_TAIL = """
+- Use the official app to find the RBL number
+- Check station signage for RBL numbers
+
+Once you have the RBL number, use the get_station_monitor tool.
+    """
+
+# RBL numbers are purely numeric; one findall pass extracts them all and
+# drops whitespace, stray separators and empty items in the same step
+_RBL_RE = re.compile(r"\d+")
+
+# Upper bound on one fan-out so a malformed list cannot translate into
+# hundreds of concurrent upstream requests
+_MAX_RBLS = 50
+
+# Shared default for optional sub-objects; handing .get the same dict
+# every time avoids allocating a fresh empty one per departure. Read-only.
+_EMPTY: dict = {}
+
+# Indicator glyphs indexed by flag value; a tuple index replaces the
+# per-departure ternaries on the formatting hot path
+# Departure row layout, parsed once at import; format_map slots the
+# precomputed fragments in without re-scanning a literal per call
+_DEP_TMPL = "{time} - {line} to {towards}{pl}{dir}{acc}{jam}"
+
+_BF = ("", "♿")
+_FR = ("", "🚪")
+_JAM = ("", "🚫")
+_RT = ("⚫", "🔴")
+
+# Every tool call reuses this pooled client, so the TLS session to
+# wienerlinien.at survives between requests instead of being set up each
+# time. The pool timeout stays unset so bursty multi-RBL fan-outs queue
+# for a connection rather than failing spuriously.
+_CLIENT = httpx.AsyncClient(
+    http2=True,
+    headers={
+        "User-Agent": USER_AGENT,
+        "Accept": "application/json",
+        # Monitor JSON compresses roughly 10:1; brotli where the server
+        # offers it, gzip otherwise
+        "Accept-Encoding": "gzip, br",
+    },
+    timeout=httpx.Timeout(connect=5.0, read=15.0, write=5.0, pool=None),
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+)
+
 
 async def make_transport_request(url: str) -> dict[str, Any] | None:
     """Make a request to the Wiener Linien API with proper error handling."""
-    headers = {"User-Agent": USER_AGENT, "Accept": "application/json"}
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, headers=headers, timeout=30.0)
+    try:
+        # Streaming lets an error status abort before the body is pulled;
+        # aread() then hands the decoder one contiguous buffer
+        async with _CLIENT.stream("GET", url) as response:
             response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"Error making request to {url}: {e}")
-            return None
+            return _json_loads(await response.aread())
+    except Exception as e:
+        # %s placeholders defer formatting until the record is emitted
+        _log.warning("request to %s failed: %s", url, e)
+        return None
+
+
+# Wiener Linien refreshes real-time data roughly every 15-30s, so polls
+# inside that window can be served from memory. One lock per RBL keeps
+# concurrent callers from stampeding the upstream for the same station.
+_CACHE_TTL = 15.0
+_CACHE_MAXSIZE = 256
+_CACHE: dict[str, tuple[float, dict]] = {}
+_CACHE_LOCKS: dict[str, asyncio.Lock] = {}
+
+
+async def _fetch_monitor(rbl: str) -> dict[str, Any] | None:
+    """Fetch monitor data for a single RBL through the TTL cache."""
+    hit = _CACHE.get(rbl)
+    if hit is not None and time.monotonic() - hit[0] < _CACHE_TTL:
+        return hit[1]
+
+    lock = _CACHE_LOCKS.get(rbl)
+    if lock is None:
+        # Keep the lock table bounded alongside the cache: recycle an idle
+        # lock once the cap is reached; any current holder keeps its
+        # own reference
+        if len(_CACHE_LOCKS) >= _CACHE_MAXSIZE:
+            for stale_rbl, stale_lock in _CACHE_LOCKS.items():
+                if not stale_lock.locked():
+                    del _CACHE_LOCKS[stale_rbl]
+                    break
+        lock = _CACHE_LOCKS.setdefault(rbl, asyncio.Lock())
+    async with lock:
+        # Another caller may have refreshed the entry while we waited
+        hit = _CACHE.get(rbl)
+        if hit is not None and time.monotonic() - hit[0] < _CACHE_TTL:
+            return hit[1]
+
+        data = await make_transport_request(f"{WIENER_LINIEN_API_BASE}/monitor?rbl={rbl}")
+        if data is not None:
+            # Evict the oldest entry at the bound so distinct RBLs cannot
+            # grow the cache without limit
+            if len(_CACHE) >= _CACHE_MAXSIZE and rbl not in _CACHE:
+                _CACHE.pop(next(iter(_CACHE)))
+            _CACHE[rbl] = (time.monotonic(), data)
+        return data
 
 
 def format_departure(departure: dict, line_name: str) -> str:
     """Format a departure into a readable string."""
-    departure_time = departure.get("departureTime", {})
-    vehicle = departure.get("vehicle", {})
+    dt_get = departure.get("departureTime", _EMPTY).get
+    vget = departure.get("vehicle", _EMPTY).get
 
     # Get countdown or planned time
-    countdown = departure_time.get("countdown")
-    planned_time = departure_time.get("timePlanned", "")
-    real_time = departure_time.get("timeReal", "")
+    countdown = dt_get("countdown")
+    planned_time = dt_get("timePlanned", "")
+    real_time = dt_get("timeReal", "")
+
+    # Timestamps are fixed-format ISO-8601 (YYYY-MM-DDTHH:MM:SS+0200), so
+    # the HH:MM display is a direct slice; no datetime parse or strftime
+    hhmm = planned_time[11:16] if len(planned_time) >= 16 else "??:??"
 
-    # Format time display
+    # Format time display in one build, no string reassignment
     if countdown is not None:
-        time_display = f"in {countdown} min"
         if planned_time:
-            planned_dt = datetime.fromisoformat(planned_time.replace('+0200', ''))
-            time_display += f" ({planned_dt.strftime('%H:%M')})"
-    else:
-        if planned_time:
-            planned_dt = datetime.fromisoformat(planned_time.replace('+0200', ''))
-            time_display = planned_dt.strftime('%H:%M')
+            time_display = f"in {countdown} min ({hhmm})"
         else:
-            time_display = "Unknown"
+            time_display = f"in {countdown} min"
+    elif planned_time:
+        time_display = hhmm
+    else:
+        time_display = "Unknown"
 
     # Get destination
-    towards = vehicle.get("towards", "Unknown destination").strip()
+    towards = vget("towards", "Unknown destination").strip()
 
     # Get platform/direction info
-    platform = vehicle.get("platform", "")
-    direction = vehicle.get("direction", "")
+    platform = vget("platform", "")
+    direction = vget("direction", "")
 
     # Accessibility info
-    barrier_free = "♿" if vehicle.get("barrierFree", False) else ""
-    folding_ramp = "🚪" if vehicle.get("foldingRamp", False) else ""
+    barrier_free = _BF[vget("barrierFree") is True]
+    folding_ramp = _FR[vget("foldingRamp") is True]
 
     # Traffic jam indication
-    traffic_jam = "🚫" if vehicle.get("trafficjam", False) else ""
-
-    platform_info = f" Pl. {platform}" if platform else ""
-    direction_info = f" Dir. {direction}" if direction else ""
-    accessibility = f" {barrier_free}{folding_ramp}".strip()
-    jam_info = f" {traffic_jam}" if traffic_jam else ""
-
-    return f"{time_display} - {line_name} to {towards}{platform_info}{direction_info}{accessibility}{jam_info}"
+    traffic_jam = _JAM[vget("trafficjam") is True]
+
+    # Optional pieces carry their own prefix or stay blank, so the shared
+    # template can be filled in one format_map pass
+    return _DEP_TMPL.format_map({
+        "time": time_display,
+        "line": line_name,
+        "towards": towards,
+        "pl": f" Pl. {platform}" if platform else "",
+        "dir": f" Dir. {direction}" if direction else "",
+        "acc": f" {barrier_free}{folding_ramp}".strip(),
+        "jam": f" {traffic_jam}" if traffic_jam else "",
+    })
+
+
+def format_monitor_data(monitor_data: dict, out: list[str]) -> None:
+    """Append readable fragments for one monitor to `out`.
+
+    Callers join the list once at the end, so multi-monitor responses are
+    assembled in a single pass instead of re-copying joined strings.
+    """
+    location_stop = monitor_data.get("locationStop", _EMPTY)
+    pget = location_stop.get("properties", _EMPTY).get
 
+    # Peek at the lines first: a station without departures needs only its
+    # title, so skip the coordinate and attribute walks entirely
+    lines = monitor_data.get("lines")
+    if not lines:
+        out.append(f"Station: {pget('title', 'Unknown Station')}")
+        out.append("\nNo departures available at this time.")
+        return
 
-def format_monitor_data(monitor_data: dict) -> str:
-    """Format monitor data into a readable string."""
-    location_stop = monitor_data.get("locationStop", {})
-    properties = location_stop.get("properties", {})
-    geometry = location_stop.get("geometry", {})
+    geometry = location_stop.get("geometry", _EMPTY)
 
     # Station information
-    station_name = properties.get("title", "Unknown Station")
-    station_id = properties.get("name", "")
-    municipality = properties.get("municipality", "")
-    rbl = properties.get("attributes", {}).get("rbl", "")
-
-    # Coordinates
-    coordinates = geometry.get("coordinates", [0, 0])
-    lon, lat = coordinates if len(coordinates) >= 2 else (0, 0)
-
-    # Format header
-    header = f"Station: {station_name}"
+    station_name = pget("title", "Unknown Station")
+    station_id = pget("name", "")
+    municipality = pget("municipality", "")
+    rbl = pget("attributes", _EMPTY).get("rbl", "")
+
+    # Coordinates; well-formed payloads always carry a pair, so try the
+    # indexed reads directly and fall back only on the odd malformed one
+    coordinates = geometry.get("coordinates")
+    try:
+        lon, lat = coordinates[0], coordinates[1]
+    except (IndexError, TypeError):
+        lon, lat = 0.0, 0.0
+
+    # Format header; collect fragments and join once instead of growing a
+    # str with +=
+    header_parts = [f"Station: {station_name}"]
     if municipality:
-        header += f", {municipality}"
+        header_parts.append(f", {municipality}")
     if rbl:
-        header += f" (RBL: {rbl})"
+        header_parts.append(f" (RBL: {rbl})")
     if station_id:
-        header += f" (ID: {station_id})"
-    header += f"\nLocation: {lat:.6f}, {lon:.6f}\n"
-
-    # Process lines and departures
-    lines = monitor_data.get("lines", [])
-    if not lines:
-        return header + "No departures available at this time."
+        header_parts.append(f" (ID: {station_id})")
+    header_parts.append(f"\nLocation: {lat:.6f}, {lon:.6f}\n")
+    out.extend(header_parts)
 
-    all_departures = []
+    first_line = True
     for line in lines:
-        line_name = line.get("name", "Unknown")
-        line_towards = line.get("towards", "").strip()
-        line_direction = line.get("direction", "")
-        platform = line.get("platform", "")
-        barrier_free = "♿" if line.get("barrierFree", False) else ""
-        realtime_supported = "🔴" if line.get("realtimeSupported", False) else "⚫"
-
-        departures_data = line.get("departures", {})
-        departures = departures_data.get("departure", [])
-
-        if departures:
-            # Add line header
-            line_header = f"\n{realtime_supported} Line {line_name}"
+        lget = line.get
+        line_name = lget("name", "Unknown")
+        line_towards = lget("towards", "").strip()
+        realtime_supported = _RT[lget("realtimeSupported") is True]
+
+        # Pull the departures up front so idle lines bail before the
+        # platform and accessibility lookups
+        departures = (lget("departures") or _EMPTY).get("departure") or ()
+
+        if not first_line:
+            out.append("\n")
+        first_line = False
+
+        if not departures:
+            out.append(f"\n{realtime_supported} Line {line_name}")
             if line_towards:
-                line_header += f" → {line_towards}"
-            if platform:
-                line_header += f" (Platform {platform})"
-            if barrier_free:
-                line_header += f" {barrier_free}"
-
-            all_departures.append(line_header)
-
-            # Add individual departures (limit to first 10 per line)
-            for departure in departures[:10]:
-                formatted_departure = format_departure(departure, line_name)
-                all_departures.append(f"  {formatted_departure}")
-        else:
-            all_departures.append(f"\n{realtime_supported} Line {line_name} → {line_towards}: No departures")
+                out.append(f" → {line_towards}")
+            out.append(": No departures")
+            continue
+
+        platform = lget("platform", "")
+        barrier_free = _BF[lget("barrierFree") is True]
+
+        # Add line header
+        out.append(f"\n{realtime_supported} Line {line_name}")
+        if line_towards:
+            out.append(f" → {line_towards}")
+        if platform:
+            out.append(f" (Platform {platform})")
+        if barrier_free:
+            out.append(f" {barrier_free}")
 
-    return header + "\n".join(all_departures)
+        # Add individual departures (limit to first 10 per line);
+        # islice iterates in place without copying the sublist
+        for departure in islice(departures, 10):
+            formatted_departure = format_departure(departure, line_name)
+            out.append(f"\n  {formatted_departure}")
 
 
 @mcp.tool()
@@ -140,9 +304,11 @@ async def get_station_monitor(rbl: str) -> str:
         rbl: RBL (Rechnergestütztes Betriebsleitsystem) number for the station
              Example: 4127 for Kagran U1 station
     """
-    url = f"{WIENER_LINIEN_API_BASE}/monitor?rbl={rbl}"
+    rbl = rbl.strip()
+    if not _RBL_RE.fullmatch(rbl):
+        return f"Invalid RBL number: {rbl} (expected digits, e.g. 4127)"
 
-    data = await make_transport_request(url)
+    data = await _fetch_monitor(rbl)
 
     if not data:
         return f"Unable to fetch station data for RBL {rbl}."
@@ -158,8 +324,9 @@ async def get_station_monitor(rbl: str) -> str:
         return f"No monitor data found for RBL {rbl}."
 
     # Format the first monitor (there should typically be only one per RBL)
-    monitor = monitors[0]
-    return format_monitor_data(monitor)
+    out: list[str] = []
+    format_monitor_data(monitors[0], out)
+    return "".join(out)
 
 
 @mcp.tool()
@@ -170,38 +337,41 @@ async def get_multiple_stations_monitor(rbl_list: str) -> str:
         rbl_list: Comma-separated list of RBL numbers
                   Example: "4127,4128,4129"
     """
-    rbl_numbers = [rbl.strip() for rbl in rbl_list.split(",") if rbl.strip()]
+    rbl_numbers = _RBL_RE.findall(rbl_list)
 
     if not rbl_numbers:
         return "No valid RBL numbers provided."
 
-    # Build URL with multiple RBL parameters
-    rbl_params = "&".join([f"rbl={rbl}" for rbl in rbl_numbers])
-    url = f"{WIENER_LINIEN_API_BASE}/monitor?{rbl_params}"
+    if len(rbl_numbers) > _MAX_RBLS:
+        return f"Too many RBL numbers ({len(rbl_numbers)}); at most {_MAX_RBLS} per request."
+
+    # Fan out per RBL over the pooled client; only stale entries actually
+    # hit the network, fresh ones return from the cache in _fetch_monitor
+    results_data = await asyncio.gather(
+        *(_fetch_monitor(rbl) for rbl in rbl_numbers),
+        return_exceptions=True,
+    )
+
+    # Merge the monitors from every successful per-RBL response
+    monitors = []
+    for data in results_data:
+        if isinstance(data, BaseException) or not data:
+            continue
+        if data.get("message", {}).get("messageCode") != 1:
+            continue
+        monitors.extend(data.get("data", {}).get("monitors", []))
 
-    data = await make_transport_request(url)
-
-    if not data:
-        return f"Unable to fetch station data for RBLs: {', '.join(rbl_numbers)}."
-
-    # Check for API errors
-    message = data.get("message", {})
-    if message.get("messageCode") != 1:
-        return f"API Error: {message.get('value', 'Unknown error')} for RBLs: {', '.join(rbl_numbers)}"
-
-    # Get monitor data
-    monitors = data.get("data", {}).get("monitors", [])
     if not monitors:
         return f"No monitor data found for RBLs: {', '.join(rbl_numbers)}."
 
-    # Format all monitors
-    results = []
+    # Format all monitors into one fragment list joined a single time
+    out: list[str] = []
     for i, monitor in enumerate(monitors):
         if i > 0:
-            results.append("\n" + "="*80 + "\n")
-        results.append(format_monitor_data(monitor))
+            out.append(_MONITOR_SEP)
+        format_monitor_data(monitor, out)
 
-    return "\n".join(results)
+    return "".join(out)
 
 
 @mcp.tool()
@@ -214,26 +384,8 @@ async def search_vienna_stations(name: str) -> str:
     """
     # Note: This would typically require a different API endpoint for station search
     # For now, we'll provide guidance on how to find RBL numbers
-    return f"""
-To find RBL numbers for Vienna stations:
-
-1. Visit: https://www.wienerlinien.at/ogd_realtime/
-2. Look for station lists or use the official Wiener Linien app
-3. Common stations and their RBL numbers:
-   - Stephansplatz U1: 4201
-   - Karlsplatz U1: 4205
-   - Schwedenplatz U1: 4202
-   - Westbahnhof U3: 4301
-   - Kagran U1: 4127
-   - Schottentor U2: 4021
-
-For station "{name}", you can:
-- Try searching online for "Wiener Linien {name} RBL"
-- Use the official app to find the RBL number
-- Check station signage for RBL numbers
-
-Once you have the RBL number, use the get_station_monitor tool.
-    """
+    return (f'{_SEARCH_HEAD}For station "{name}", you can:\n'
+            f'- Try searching online for "Wiener Linien {name} RBL"{_SEARCH_TAIL}')
 
 
 if __name__ == "__main__":